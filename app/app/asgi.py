@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/dev/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from core.handlers import StreamingASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+# get_asgi_application() with a handler that streams responses which
+# query the database as they are iterated
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/dev/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
@@ -41,11 +42,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
-    'user',
-    'recipe',
+    'user.apps.UserConfig',
+    'recipe.apps.RecipeConfig',
 ]
 
 MIDDLEWARE = [
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -92,6 +95,28 @@ DATABASES = {
     }
 }
 
+# read only copies of the default database, one per host in the comma
+# separated DB_REPLICA_HOSTS. GET and HEAD requests to views with
+# replica_reads set read from one of them, see core.routers. In tests they
+# mirror the default database, so two aliases can be tried out locally with
+# DB_REPLICA_HOSTS set to DB_HOST
+DATABASE_REPLICAS = []
+for host in os.environ.get('DB_REPLICA_HOSTS', '').split(','):
+    if host.strip():
+        alias = 'replica{}'.format(len(DATABASE_REPLICAS) + 1)
+        DATABASES[alias] = dict(
+            DATABASES['default'],
+            HOST=host.strip(),
+            TEST={'MIRROR': 'default'},
+        )
+        DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# seconds a client reads from the primary after each of its writes, so it
+# sees them before the replicas catch up
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-password-validators
@@ -131,4 +156,102 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'core.User'
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('PAGE_SIZE', 100)),
+}
+
+# upper bound for the page_size query parameter on list endpoints
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+
+# limits for creating a list of tags or ingredients in one request
+BULK_CREATE_MAX_ITEMS = 1000
+BULK_CREATE_MAX_BYTES = 1024 * 1024
+
+# number of hash partitions core_recipe and its tag and ingredient tables
+# are split into by migration core 0013, 0 to leave them unpartitioned. Only
+# read when that migration runs
+RECIPE_PARTITIONS = int(os.environ.get('RECIPE_PARTITIONS', 0))
+
+# number of recipes written per transaction by the NDJSON recipe import
+RECIPE_IMPORT_BATCH_SIZE = 1000
+
+# recipes fetched per server side cursor round trip by the recipe export
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+
+# shared by every process serving the api on a host, so token
+# invalidations and rebuilt similarity indexes are seen by all of them.
+# Deployments spread over several hosts need a cache server, memcached or
+# redis, in its place
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'CACHE_DIR', os.path.join(tempfile.gettempdir(), 'recipe-cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# token to user lookups cached by user.authentication.CachedTokenAuthentication
+# ALIAS names the shared Django cache, set it to None to only cache in process
+TOKEN_AUTH_CACHE = {
+    'ALIAS': 'default',
+    'TTL': 300,
+    'LOCAL_MAX_SIZE': 10000,
+    'LOCAL_TTL': 30,
+}
+
+# rendered list responses kept in process by recipe.mixins.CachedListMixin
+RESPONSE_CACHE = {
+    'MAX_SIZE': 10000,
+    'MAX_BYTES': 32 * 1024 * 1024,
+    'TTL': 300,
+}
+# per user ingredient bitsets used by the recipe pantry endpoint
+PANTRY_INDEX = {
+    'MAX_USERS': 1000,
+    'TTL': 3600,
+}
+
+# per user ingredient and tag vectors used by the similar recipes endpoint,
+# indexes are also kept in the SHARED_ALIAS cache so other processes and the
+# rebuild_similarity_index command can share them. It must not be a local
+# memory cache, which only the process that wrote it can read
+SIMILARITY_INDEX = {
+    'MAX_USERS': 1000,
+    'TTL': 3600,
+    'SHARED_ALIAS': 'default',
+    'SHARED_TTL': 24 * 60 * 60,
+}
+
+# most recipes that can be combined into one shopping list
+SHOPPING_LIST_MAX_RECIPES = 100
+
+# percentiles of price and time_minutes and number of most used tags and
+# ingredients returned by the recipe stats endpoint
+RECIPE_STATS = {
+    'PERCENTILES': (50, 90, 99),
+    'TOP': 10,
+}
+
+# default and largest number of tag and ingredient names returned by the
+# autocomplete endpoints
+AUTOCOMPLETE = {
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+# per user sorted tag and ingredient names used by the autocomplete
+# endpoints, rebuilt after writes to the collection
+NAME_INDEX = {
+    'MAX_USERS': 1000,
+    'TTL': 3600,
+}
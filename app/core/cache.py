@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread safe in process cache that evicts the least recently used
+    entries once max_size entries, or max_weight in total, are reached and
+    expires entries after ttl seconds"""
+
+    def __init__(self, max_size, ttl=None, max_weight=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def weigh(self, value):
+        """Return the weight of a value counted against max_weight"""
+        return 1
+
+    def evicted(self, key, value):
+        """Called with the lock held whenever an entry is removed"""
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss"""
+        with self._lock:
+            try:
+                value, expires, _weight = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires is not None and expires <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def peek(self, key, default=None):
+        """Return the cached value for key without counting a lookup or
+        marking it recently used"""
+        with self._lock:
+            entry = self._data.get(key)
+
+        return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        """Cache value for key, evicting the oldest entries if full"""
+        if self.max_size <= 0:
+            return
+
+        expires = None
+        if self.ttl is not None:
+            expires = time.monotonic() + self.ttl
+        weight = self.weigh(value)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (value, expires, weight)
+            self.weight += weight
+            while len(self._data) > self.max_size or (
+                self.max_weight is not None and self.weight > self.max_weight
+            ):
+                self._remove(next(iter(self._data)))
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counters and the current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'size': len(self._data),
+            'weight': self.weight,
+        }
+
+    def _remove(self, key):
+        try:
+            value, _expires, weight = self._data.pop(key)
+        except KeyError:
+            return
+
+        self.weight -= weight
+        self.evicted(key, value)
@@ -0,0 +1,60 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGI handler that reads streaming response content in the thread
+    the view ran in.
+
+    The content of a streaming response can query the database as it is
+    iterated, which isn't allowed from the event loop, so each part is
+    fetched with sync_to_async and sent before the next is read.
+
+    From asgiref 3.3, which requirements.txt pins, the view and each part
+    run with thread_sensitive, on the one thread all of Django's sync code
+    shares under ASGI. Concurrent exports therefore take turns on it, one
+    part at a time, with every other request's sync code"""
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': self.encode_headers(response),
+        })
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        done = object()
+        while True:
+            part = await next_part(parts, done)
+            if part is done:
+                break
+            for chunk, _last in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        # closing sends request_finished, which closes the connection
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+    @staticmethod
+    def encode_headers(response):
+        """Return the headers and cookies of response as ASGI headers"""
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((
+                b'Set-Cookie',
+                cookie.output(header='').encode('ascii').strip()
+            ))
+
+        return headers
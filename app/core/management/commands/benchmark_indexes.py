@@ -0,0 +1,187 @@
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.models import Tag, Ingredient, Recipe
+
+
+BENCHMARK_EMAIL = 'benchmark{}@example.com'
+
+# indexes added in core.0005_listing_indexes, dropped to measure "before".
+# The ingredient name index went with the name column in core.0012
+LISTING_INDEXES = [
+    'core_tag_user_name_idx',
+    'core_recipe_user_title_idx',
+    'core_recipe_tags_tag_recipe_idx',
+    'core_recipe_ingredients_ingredient_recipe_idx',
+]
+
+
+class Command(BaseCommand):
+    """Django command to compare the per user listing query plans and
+    latency with and without the listing indexes.
+
+    Seeds benchmark users with generate_series, so run it against a
+    scratch database, the "before" run drops the indexes inside a
+    transaction that is rolled back afterwards"""
+    help = 'Benchmark per user listing queries with and without indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--tags', type=int, default=50,
+                            help='tags and ingredients per user')
+        parser.add_argument('--per-recipe', type=int, default=4,
+                            help='tags and ingredients per recipe')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--reseed', action='store_true',
+                            help='delete and recreate the benchmark data')
+
+    def handle(self, *args, **options):
+        users = self.get_or_seed_users(options)
+        user = users[0]
+        tag = Tag.objects.filter(user=user).first()
+        ingredient = Ingredient.objects.filter(user=user).first()
+        page_size = options['page_size']
+
+        queries = {
+            'tag list': Tag.objects.filter(
+                user=user
+            ).order_by('-name', '-id')[:page_size],
+            'ingredient list': Ingredient.objects.filter(
+                user=user
+            ).order_by('-name', '-id')[:page_size],
+            'recipe list': Recipe.objects.filter(
+                user=user
+            ).order_by('-title', '-id')[:page_size],
+            'recipes by tag': Recipe.tags.through.objects.filter(
+                tag=tag
+            ).values('recipe_id'),
+            'recipes by ingredient': Recipe.ingredients.through.objects.filter(
+                ingredient=ingredient
+            ).values('recipe_id'),
+        }
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for index in LISTING_INDEXES:
+                    cursor.execute('DROP INDEX IF EXISTS {}'.format(index))
+            before = self.measure(queries, options['repeat'])
+            transaction.set_rollback(True)
+        after = self.measure(queries, options['repeat'])
+
+        for name in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, results in (('before', before), ('after', after)):
+                latency, plan = results[name]
+                self.stdout.write('  {}: {:.3f} ms median'.format(
+                    label, latency
+                ))
+                for line in plan:
+                    self.stdout.write('    ' + line)
+
+    def measure(self, queries, repeat):
+        """Return the median latency and plan of each query"""
+        results = {}
+        with connection.cursor() as cursor:
+            for name, queryset in queries.items():
+                sql, params = queryset.query.sql_with_params()
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.append((time.perf_counter() - start) * 1000)
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+                plan = [row[0] for row in cursor.fetchall()]
+                results[name] = (statistics.median(timings), plan)
+
+        return results
+
+    def get_or_seed_users(self, options):
+        """Return the benchmark users, seeding them if needed"""
+        emails = [BENCHMARK_EMAIL.format(n) for n in range(options['users'])]
+        users = get_user_model().objects.filter(email__in=emails)
+        if not options['reseed'] and users.count() == len(emails):
+            return list(users.order_by('id'))
+
+        self.stdout.write('Seeding benchmark data...')
+        self.delete(list(users.values_list('id', flat=True)))
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(email=email, password='!') for email in emails
+        ])
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.seed(cursor, users, options)
+        with connection.cursor() as cursor:
+            # vacuum sets the visibility map so index only scans are used,
+            # it can't run inside a transaction so fall back to analyze
+            if connection.in_atomic_block:
+                cursor.execute('ANALYZE')
+            else:
+                cursor.execute('VACUUM ANALYZE')
+        self.stdout.write(self.style.SUCCESS('Benchmark data seeded'))
+
+        return users
+
+    def delete(self, user_ids):
+        """Delete previous benchmark data without loading it in memory"""
+        recipe_table = Recipe._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            for field_name in ('tags', 'ingredients'):
+                through = getattr(Recipe, field_name).through
+                cursor.execute(
+                    'DELETE FROM {} WHERE recipe_id IN ('
+                    '  SELECT id FROM {} WHERE user_id = ANY(%s)'
+                    ')'.format(through._meta.db_table, recipe_table),
+                    [user_ids]
+                )
+            for model in (Recipe, Tag, Ingredient):
+                cursor.execute(
+                    'DELETE FROM {} WHERE user_id = ANY(%s)'.format(
+                        model._meta.db_table
+                    ),
+                    [user_ids]
+                )
+            get_user_model().objects.filter(id__in=user_ids).delete()
+
+    def seed(self, cursor, users, options):
+        """Bulk insert tags, ingredients, recipes and their links"""
+        user_ids = [user.id for user in users]
+        count = options['tags']
+        per_recipe = options['per_recipe']
+        recipe_table = Recipe._meta.db_table
+        for model in (Tag, Ingredient):
+            names = [
+                '{} {}'.format(model.__name__.lower(), number)
+                for number in range(1, count + 1)
+            ]
+            for user in users:
+                model.objects.get_or_create_names(user, names)
+
+        cursor.execute(
+            'INSERT INTO {} (user_id, title, time_minutes, price, link) '
+            'SELECT (%s::int[])[1 + g %% %s], md5(g::text), '
+            '1 + g %% 240, (g %% 99999) / 100.0, %s '
+            'FROM generate_series(1, %s) AS g'.format(recipe_table),
+            [user_ids, len(user_ids), '', options['recipes']]
+        )
+
+        # link each recipe to per_recipe distinct rows of its own user
+        for field_name in ('tags', 'ingredients'):
+            field = getattr(Recipe, field_name).field
+            cursor.execute(
+                'INSERT INTO {through} (recipe_id, {target}) '
+                'SELECT r.id, t.id FROM {recipe} r '
+                'CROSS JOIN LATERAL ('
+                '  SELECT id FROM {related} WHERE user_id = r.user_id '
+                '  ORDER BY id OFFSET (r.id %% %s) LIMIT %s'
+                ') t WHERE r.user_id = ANY(%s)'.format(
+                    through=field.remote_field.through._meta.db_table,
+                    target=field.m2m_reverse_name(),
+                    recipe=recipe_table,
+                    related=field.related_model._meta.db_table,
+                ),
+                [max(count - per_recipe, 1), per_recipe, user_ids]
+            )
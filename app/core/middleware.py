@@ -0,0 +1,76 @@
+import time
+from django.conf import settings
+from core.routers import choose_replica, current_replica
+
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+# holds the time until which a client reads from the primary, set on the
+# response to each of its writes. Clients that don't keep cookies can send
+# the header back instead
+PIN_COOKIE = 'pin_primary'
+PIN_HEADER = 'X-Pin-Primary'
+
+
+def pinned_until(request):
+    """Return the time until which request reads from the primary, 0 if
+    it isn't pinned"""
+    now = time.time()
+    for value in (request.COOKIES.get(PIN_COOKIE),
+                  request.META.get('HTTP_X_PIN_PRIMARY')):
+        try:
+            until = float(value)
+        except (TypeError, ValueError):
+            continue
+        # a pin can't be longer than the window of one write
+        if now < until <= now + settings.REPLICA_PIN_SECONDS:
+            return until
+
+    return 0
+
+
+class ReplicaRoutingMiddleware:
+    """Read GET and HEAD requests to views with replica_reads set from a
+    replica, unless the client wrote within the last REPLICA_PIN_SECONDS
+    and is pinned to the primary so it reads its own writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, 'replica_token', None)
+            if token is not None:
+                current_replica.reset(token)
+
+        if settings.DATABASE_REPLICAS and \
+                request.method not in SAFE_METHODS and \
+                response.status_code < 400:
+            self.pin(response)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        if request.method not in SAFE_METHODS or \
+                not getattr(view_class, 'replica_reads', False) or \
+                pinned_until(request):
+            return None
+
+        replica = choose_replica()
+        if replica is not None:
+            request.replica_token = current_replica.set(replica)
+
+        return None
+
+    def pin(self, response):
+        """Pin the client to the primary for REPLICA_PIN_SECONDS"""
+        seconds = settings.REPLICA_PIN_SECONDS
+        until = '{:.3f}'.format(time.time() + seconds)
+        response.set_cookie(
+            PIN_COOKIE, until, max_age=seconds, httponly=True,
+            samesite='Lax'
+        )
+        response[PIN_HEADER] = until
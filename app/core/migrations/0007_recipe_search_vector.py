@@ -0,0 +1,182 @@
+# Generated by Django 3.0.14 on 2026-10-18 19:02
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently
+import django.contrib.postgres.indexes
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 10000
+
+# title is weighted A, tag names B and ingredient names C
+SEARCH_FUNCTION = '''
+CREATE OR REPLACE FUNCTION core_recipe_search_vector(recipe_id integer, title text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_recipe_tags rt JOIN core_tag t ON t.id = rt.tag_id
+            WHERE rt.recipe_id = $1
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_recipe_ingredients ri
+            JOIN core_ingredient i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = $1
+        ), '')), 'C')
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_vector_row() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := core_recipe_search_vector(NEW.id, NEW.title);
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_relation_inserted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title)
+    WHERE r.id IN (SELECT DISTINCT recipe_id FROM new_rows);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_relation_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title)
+    WHERE r.id IN (SELECT DISTINCT recipe_id FROM old_rows);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_tag_renamed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title)
+    WHERE r.id IN (SELECT recipe_id FROM core_recipe_tags WHERE tag_id = NEW.id);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_ingredient_renamed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title)
+    WHERE r.id IN (
+        SELECT recipe_id FROM core_recipe_ingredients WHERE ingredient_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$;
+'''
+
+# the relation triggers run once per statement over the changed rows, so a
+# bulk insert of links updates each recipe once
+SEARCH_TRIGGERS = '''
+CREATE TRIGGER core_recipe_search_vector_trg
+BEFORE INSERT OR UPDATE OF title ON core_recipe
+FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_vector_row();
+
+CREATE TRIGGER core_recipe_tags_search_ins_trg
+AFTER INSERT ON core_recipe_tags REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_relation_inserted();
+
+CREATE TRIGGER core_recipe_tags_search_del_trg
+AFTER DELETE ON core_recipe_tags REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_relation_deleted();
+
+CREATE TRIGGER core_recipe_ingredients_search_ins_trg
+AFTER INSERT ON core_recipe_ingredients REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_relation_inserted();
+
+CREATE TRIGGER core_recipe_ingredients_search_del_trg
+AFTER DELETE ON core_recipe_ingredients REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_relation_deleted();
+
+CREATE TRIGGER core_tag_search_rename_trg
+AFTER UPDATE OF name ON core_tag
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE PROCEDURE core_recipe_search_tag_renamed();
+
+CREATE TRIGGER core_ingredient_search_rename_trg
+AFTER UPDATE OF name ON core_ingredient
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE PROCEDURE core_recipe_search_ingredient_renamed();
+'''
+
+DROP_SEARCH_TRIGGERS = '''
+DROP TRIGGER IF EXISTS core_recipe_search_vector_trg ON core_recipe;
+DROP TRIGGER IF EXISTS core_recipe_tags_search_ins_trg ON core_recipe_tags;
+DROP TRIGGER IF EXISTS core_recipe_tags_search_del_trg ON core_recipe_tags;
+DROP TRIGGER IF EXISTS core_recipe_ingredients_search_ins_trg ON core_recipe_ingredients;
+DROP TRIGGER IF EXISTS core_recipe_ingredients_search_del_trg ON core_recipe_ingredients;
+DROP TRIGGER IF EXISTS core_tag_search_rename_trg ON core_tag;
+DROP TRIGGER IF EXISTS core_ingredient_search_rename_trg ON core_ingredient;
+'''
+
+DROP_SEARCH_FUNCTION = '''
+DROP FUNCTION IF EXISTS core_recipe_search_ingredient_renamed();
+DROP FUNCTION IF EXISTS core_recipe_search_tag_renamed();
+DROP FUNCTION IF EXISTS core_recipe_search_relation_deleted();
+DROP FUNCTION IF EXISTS core_recipe_search_relation_inserted();
+DROP FUNCTION IF EXISTS core_recipe_search_vector_row();
+DROP FUNCTION IF EXISTS core_recipe_search_vector(integer, text);
+'''
+
+
+# recipes written since the triggers were added already have a vector
+BACKFILL_BATCH = '''
+UPDATE core_recipe SET search_vector = core_recipe_search_vector(id, title)
+WHERE id >= %(start)s AND id < %(end)s AND search_vector IS NULL
+'''
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Fill in the vectors of existing recipes, a transaction per batch
+    of ids so no lock is held on the whole table"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM core_recipe')
+        low, high = cursor.fetchone()
+    if low is None:
+        return
+
+    for start in range(low, high + 1, BATCH_SIZE):
+        params = {'start': start, 'end': start + BATCH_SIZE}
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(BACKFILL_BATCH, params)
+
+
+class Migration(migrations.Migration):
+    # every operation commits on its own, the backfill batches each commit
+    # and the index is built concurrently, which can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_collectionversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(SEARCH_FUNCTION, DROP_SEARCH_FUNCTION),
+        migrations.RunSQL(SEARCH_TRIGGERS, DROP_SEARCH_TRIGGERS),
+        migrations.RunPython(
+            backfill_search_vector, migrations.RunPython.noop
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_idx'),
+        ),
+    ]
@@ -0,0 +1,313 @@
+# Generated by Django 3.0.14 on 2026-10-18 18:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# adds (sign 1) or removes (sign -1) recipes from the stats of their users,
+# removals only update existing rows so deleting a user, whose stats may
+# already be gone, doesn't recreate them
+STATS_FUNCTION = '''
+CREATE OR REPLACE FUNCTION core_recipestats_apply(
+    sign integer, user_ids integer[], prices numeric[], times integer[]
+) RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF sign > 0 THEN
+        INSERT INTO core_recipestats AS s (user_id, recipe_count, tag_count,
+            ingredient_count, price_sum, time_minutes_sum)
+        SELECT r.user_id, count(*), 0, 0, sum(r.price), sum(r.time_minutes)
+        FROM unnest(user_ids, prices, times) AS r(user_id, price, time_minutes)
+        GROUP BY r.user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            recipe_count = s.recipe_count + EXCLUDED.recipe_count,
+            price_sum = s.price_sum + EXCLUDED.price_sum,
+            time_minutes_sum = s.time_minutes_sum + EXCLUDED.time_minutes_sum;
+
+        INSERT INTO core_recipevaluecount AS c (user_id, field, value, count)
+        SELECT r.user_id, f.field, f.value, count(*)
+        FROM unnest(user_ids, prices, times) AS r(user_id, price, time_minutes)
+        CROSS JOIN LATERAL (VALUES
+            ('price', r.price), ('time_minutes', r.time_minutes::numeric)
+        ) AS f(field, value)
+        GROUP BY r.user_id, f.field, f.value
+        ON CONFLICT (user_id, field, value) DO UPDATE SET
+            count = c.count + EXCLUDED.count;
+    ELSE
+        UPDATE core_recipestats s SET
+            recipe_count = s.recipe_count - d.recipe_count,
+            price_sum = s.price_sum - d.price_sum,
+            time_minutes_sum = s.time_minutes_sum - d.time_minutes_sum
+        FROM (
+            SELECT r.user_id, count(*) AS recipe_count,
+                   sum(r.price) AS price_sum,
+                   sum(r.time_minutes) AS time_minutes_sum
+            FROM unnest(user_ids, prices, times) AS r(user_id, price, time_minutes)
+            GROUP BY r.user_id
+        ) d
+        WHERE s.user_id = d.user_id;
+
+        UPDATE core_recipevaluecount c SET count = c.count - d.count
+        FROM (
+            SELECT r.user_id, f.field, f.value, count(*) AS count
+            FROM unnest(user_ids, prices, times) AS r(user_id, price, time_minutes)
+            CROSS JOIN LATERAL (VALUES
+                ('price', r.price), ('time_minutes', r.time_minutes::numeric)
+            ) AS f(field, value)
+            GROUP BY r.user_id, f.field, f.value
+        ) d
+        WHERE c.user_id = d.user_id AND c.field = d.field AND c.value = d.value;
+    END IF;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipestats_recipes_inserted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM core_recipestats_apply(1, array_agg(user_id), array_agg(price),
+                                   array_agg(time_minutes))
+    FROM new_rows;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipestats_recipes_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM core_recipestats_apply(-1, array_agg(user_id), array_agg(price),
+                                   array_agg(time_minutes))
+    FROM old_rows;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipestats_recipe_updated() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM core_recipestats_apply(-1, ARRAY[OLD.user_id], ARRAY[OLD.price],
+                                   ARRAY[OLD.time_minutes]);
+    PERFORM core_recipestats_apply(1, ARRAY[NEW.user_id], ARRAY[NEW.price],
+                                   ARRAY[NEW.time_minutes]);
+    RETURN NULL;
+END
+$$;
+'''
+
+# tag_count / ingredient_count of the stats and recipe_count of each tag and
+# ingredient, one pair of functions per model
+COUNTER_FUNCTIONS = '''
+CREATE OR REPLACE FUNCTION core_recipestats_{model}s_inserted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO core_recipestats AS s (user_id, recipe_count, tag_count,
+        ingredient_count, price_sum, time_minutes_sum)
+    SELECT user_id, 0, 0, 0, 0, 0 FROM new_rows GROUP BY user_id
+    ON CONFLICT (user_id) DO NOTHING;
+
+    UPDATE core_recipestats s SET {model}_count = s.{model}_count + d.n
+    FROM (SELECT user_id, count(*) AS n FROM new_rows GROUP BY user_id) d
+    WHERE s.user_id = d.user_id;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_recipestats_{model}s_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipestats s SET {model}_count = s.{model}_count - d.n
+    FROM (SELECT user_id, count(*) AS n FROM old_rows GROUP BY user_id) d
+    WHERE s.user_id = d.user_id;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_{model}_recipe_count_inserted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_{model} o SET recipe_count = o.recipe_count + d.n
+    FROM (SELECT {model}_id, count(*) AS n FROM new_rows GROUP BY {model}_id) d
+    WHERE o.id = d.{model}_id;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION core_{model}_recipe_count_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_{model} o SET recipe_count = o.recipe_count - d.n
+    FROM (SELECT {model}_id, count(*) AS n FROM old_rows GROUP BY {model}_id) d
+    WHERE o.id = d.{model}_id;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER core_{model}_stats_ins_trg
+AFTER INSERT ON core_{model} REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipestats_{model}s_inserted();
+
+CREATE TRIGGER core_{model}_stats_del_trg
+AFTER DELETE ON core_{model} REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipestats_{model}s_deleted();
+
+CREATE TRIGGER core_recipe_{model}s_count_ins_trg
+AFTER INSERT ON core_recipe_{model}s REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_{model}_recipe_count_inserted();
+
+CREATE TRIGGER core_recipe_{model}s_count_del_trg
+AFTER DELETE ON core_recipe_{model}s REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_{model}_recipe_count_deleted();
+'''
+
+DROP_COUNTER_FUNCTIONS = '''
+DROP TRIGGER IF EXISTS core_{model}_stats_ins_trg ON core_{model};
+DROP TRIGGER IF EXISTS core_{model}_stats_del_trg ON core_{model};
+DROP TRIGGER IF EXISTS core_recipe_{model}s_count_ins_trg ON core_recipe_{model}s;
+DROP TRIGGER IF EXISTS core_recipe_{model}s_count_del_trg ON core_recipe_{model}s;
+DROP FUNCTION IF EXISTS core_recipestats_{model}s_inserted();
+DROP FUNCTION IF EXISTS core_recipestats_{model}s_deleted();
+DROP FUNCTION IF EXISTS core_{model}_recipe_count_inserted();
+DROP FUNCTION IF EXISTS core_{model}_recipe_count_deleted();
+'''
+
+# inserts and deletes run once per statement over all changed rows, so the
+# bulk import updates each user's stats once per batch. Updates are per row
+# and only when a counted column changed, the search_vector triggers update
+# recipes too
+STATS_TRIGGERS = '''
+CREATE TRIGGER core_recipe_stats_ins_trg
+AFTER INSERT ON core_recipe REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipestats_recipes_inserted();
+
+CREATE TRIGGER core_recipe_stats_del_trg
+AFTER DELETE ON core_recipe REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipestats_recipes_deleted();
+
+CREATE TRIGGER core_recipe_stats_upd_trg
+AFTER UPDATE ON core_recipe FOR EACH ROW
+WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id
+      OR OLD.price IS DISTINCT FROM NEW.price
+      OR OLD.time_minutes IS DISTINCT FROM NEW.time_minutes)
+EXECUTE PROCEDURE core_recipestats_recipe_updated();
+'''
+
+DROP_STATS_FUNCTION = '''
+DROP TRIGGER IF EXISTS core_recipe_stats_ins_trg ON core_recipe;
+DROP TRIGGER IF EXISTS core_recipe_stats_del_trg ON core_recipe;
+DROP TRIGGER IF EXISTS core_recipe_stats_upd_trg ON core_recipe;
+DROP FUNCTION IF EXISTS core_recipestats_recipe_updated();
+DROP FUNCTION IF EXISTS core_recipestats_recipes_deleted();
+DROP FUNCTION IF EXISTS core_recipestats_recipes_inserted();
+DROP FUNCTION IF EXISTS core_recipestats_apply(integer, integer[], numeric[], integer[]);
+'''
+
+BACKFILL = '''
+LOCK TABLE core_recipe, core_tag, core_ingredient, core_recipe_tags,
+    core_recipe_ingredients IN SHARE MODE;
+
+INSERT INTO core_recipestats (user_id, recipe_count, tag_count,
+    ingredient_count, price_sum, time_minutes_sum)
+SELECT u.id, coalesce(r.recipe_count, 0),
+       (SELECT count(*) FROM core_tag t WHERE t.user_id = u.id),
+       (SELECT count(*) FROM core_ingredient i WHERE i.user_id = u.id),
+       coalesce(r.price_sum, 0), coalesce(r.time_minutes_sum, 0)
+FROM core_user u
+LEFT JOIN (
+    SELECT user_id, count(*) AS recipe_count, sum(price) AS price_sum,
+           sum(time_minutes) AS time_minutes_sum
+    FROM core_recipe GROUP BY user_id
+) r ON r.user_id = u.id;
+
+INSERT INTO core_recipevaluecount (user_id, field, value, count)
+SELECT user_id, 'price', price, count(*) FROM core_recipe
+GROUP BY user_id, price
+UNION ALL
+SELECT user_id, 'time_minutes', time_minutes, count(*) FROM core_recipe
+GROUP BY user_id, time_minutes;
+
+UPDATE core_tag o SET recipe_count = c.n
+FROM (SELECT tag_id, count(*) AS n FROM core_recipe_tags GROUP BY tag_id) c
+WHERE o.id = c.tag_id;
+
+UPDATE core_ingredient o SET recipe_count = c.n
+FROM (SELECT ingredient_id, count(*) AS n FROM core_recipe_ingredients
+      GROUP BY ingredient_id) c
+WHERE o.id = c.ingredient_id;
+'''
+
+
+class Migration(migrations.Migration):
+    # the triggers are installed and the tables backfilled in one
+    # transaction, holding off writers so no change is counted twice or
+    # missed
+
+    dependencies = [
+        ('core', '0007_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('tag_count', models.IntegerField(default=0)),
+                ('ingredient_count', models.IntegerField(default=0)),
+                ('price_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('time_minutes_sum', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeValueCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('price', 'Price'), ('time_minutes', 'Time minutes')], max_length=16)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_ingredient_user_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', 'id'], name='core_tag_user_count_idx'),
+        ),
+        migrations.AddField(
+            model_name='recipevaluecount',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='recipevaluecount',
+            constraint=models.UniqueConstraint(fields=('user', 'field', 'value'), name='core_recipevaluecount_user_field_value_uniq'),
+        ),
+        # keep a database default so raw inserts start the counters at 0
+        migrations.RunSQL(
+            'ALTER TABLE core_tag ALTER COLUMN recipe_count SET DEFAULT 0; '
+            'ALTER TABLE core_ingredient ALTER COLUMN recipe_count SET DEFAULT 0',
+            'ALTER TABLE core_tag ALTER COLUMN recipe_count DROP DEFAULT; '
+            'ALTER TABLE core_ingredient ALTER COLUMN recipe_count DROP DEFAULT',
+        ),
+        migrations.RunSQL(STATS_FUNCTION, DROP_STATS_FUNCTION),
+        migrations.RunSQL(STATS_TRIGGERS, migrations.RunSQL.noop),
+        migrations.RunSQL(
+            COUNTER_FUNCTIONS.format(model='tag'),
+            DROP_COUNTER_FUNCTIONS.format(model='tag'),
+        ),
+        migrations.RunSQL(
+            COUNTER_FUNCTIONS.format(model='ingredient'),
+            DROP_COUNTER_FUNCTIONS.format(model='ingredient'),
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
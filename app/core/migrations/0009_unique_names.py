@@ -0,0 +1,69 @@
+# Generated by Django 3.0.14 on 2026-10-18 21:03
+
+from django.db import migrations, models
+
+
+# merges each user's tags or ingredients of the same name into the oldest
+# one. Links are moved with an insert and a delete rather than an update so
+# the statement triggers of migrations 0007 and 0008 keep recipe_count,
+# the recipe stats and the search vectors right, and the versions of the
+# collections of the affected users are bumped so cached lists are dropped
+MERGE_DUPLICATES = '''
+LOCK TABLE core_{model} IN SHARE ROW EXCLUSIVE MODE;
+
+CREATE TEMPORARY TABLE core_{model}_duplicate ON COMMIT DROP AS
+SELECT id, user_id, keep_id FROM (
+    SELECT id, user_id,
+           first_value(id) OVER (PARTITION BY user_id, name ORDER BY id)
+               AS keep_id
+    FROM core_{model}
+) d
+WHERE id <> keep_id;
+
+INSERT INTO core_recipe_{model}s (recipe_id, {model}_id)
+SELECT l.recipe_id, d.keep_id
+FROM core_recipe_{model}s l
+JOIN core_{model}_duplicate d ON d.id = l.{model}_id
+ON CONFLICT DO NOTHING;
+
+DELETE FROM core_recipe_{model}s
+WHERE {model}_id IN (SELECT id FROM core_{model}_duplicate);
+
+DELETE FROM core_{model}
+WHERE id IN (SELECT id FROM core_{model}_duplicate);
+
+UPDATE core_collectionversion
+SET version = version + 1
+WHERE resource IN ('recipes', '{model}s')
+  AND user_id IN (SELECT user_id FROM core_{model}_duplicate);
+
+-- run the deferred foreign key checks now, the table can't be altered
+-- later in the transaction while they are pending
+SET CONSTRAINTS ALL IMMEDIATE;
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_stats'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            MERGE_DUPLICATES.format(model='ingredient'),
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            MERGE_DUPLICATES.format(model='tag'),
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_ingredient_user_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 3.0.14 on 2026-10-18 21:44
+
+from django.db import migrations, transaction
+
+
+BATCH_SIZE = 10000
+
+# links the ingredients in an id range that aren't linked yet to the catalog
+# rows of their names, adding the names the catalog doesn't have yet in
+# name order so concurrent inserts of the same names wait instead of
+# deadlocking. Every user's ingredient of a name shares one catalog row
+LINK_BATCH = [
+    '''
+    INSERT INTO core_catalogingredient (name)
+    SELECT DISTINCT name FROM core_ingredient
+    WHERE id >= %(start)s AND id < %(end)s AND catalog_id IS NULL
+    ORDER BY 1
+    ON CONFLICT (name) DO NOTHING
+    ''',
+    '''
+    UPDATE core_ingredient i SET catalog_id = c.id
+    FROM core_catalogingredient c
+    WHERE i.id >= %(start)s AND i.id < %(end)s AND i.catalog_id IS NULL
+      AND c.name = i.name
+    ''',
+]
+
+
+def link_catalog(apps, schema_editor):
+    """Link existing ingredients to the catalog, a transaction per batch
+    of ids so no lock is held on the whole table"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM core_ingredient')
+        low, high = cursor.fetchone()
+    if low is None:
+        return
+
+    for start in range(low, high + 1, BATCH_SIZE):
+        params = {'start': start, 'end': start + BATCH_SIZE}
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            for statement in LINK_BATCH:
+                cursor.execute(statement, params)
+
+
+class Migration(migrations.Migration):
+    # rows written while this runs are linked by 0012
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_catalogingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_catalog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 3.0.14 on 2026-10-18 21:52
+
+from importlib import import_module
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+search = import_module('core.migrations.0007_recipe_search_vector')
+
+# links the rows written since 0011 ran, holding off other writers until
+# the name column is gone
+LINK_REMAINING = '''
+LOCK TABLE core_ingredient IN SHARE ROW EXCLUSIVE MODE;
+
+INSERT INTO core_catalogingredient (name)
+SELECT DISTINCT name FROM core_ingredient
+WHERE catalog_id IS NULL
+ORDER BY 1
+ON CONFLICT (name) DO NOTHING;
+
+UPDATE core_ingredient i SET catalog_id = c.id
+FROM core_catalogingredient c
+WHERE i.catalog_id IS NULL AND c.name = i.name;
+
+-- run the deferred foreign key checks now, the table can't be altered
+-- later in the transaction while they are pending
+SET CONSTRAINTS ALL IMMEDIATE;
+'''
+
+# ingredient names are read from the catalog, and an ingredient is renamed
+# by linking it to another catalog row
+CATALOG_SEARCH = '''
+DROP TRIGGER IF EXISTS core_ingredient_search_rename_trg ON core_ingredient;
+
+CREATE OR REPLACE FUNCTION core_recipe_search_vector(recipe_id integer, title text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(t.name, ' ')
+            FROM core_recipe_tags rt JOIN core_tag t ON t.id = rt.tag_id
+            WHERE rt.recipe_id = $1
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(c.name, ' ')
+            FROM core_recipe_ingredients ri
+            JOIN core_ingredient i ON i.id = ri.ingredient_id
+            JOIN core_catalogingredient c ON c.id = i.catalog_id
+            WHERE ri.recipe_id = $1
+        ), '')), 'C')
+$$;
+
+CREATE TRIGGER core_ingredient_search_rename_trg
+AFTER UPDATE OF catalog_id ON core_ingredient
+FOR EACH ROW WHEN (OLD.catalog_id IS DISTINCT FROM NEW.catalog_id)
+EXECUTE PROCEDURE core_recipe_search_ingredient_renamed();
+'''
+
+NAME_SEARCH = '''
+DROP TRIGGER IF EXISTS core_ingredient_search_rename_trg ON core_ingredient;
+
+{functions}
+
+CREATE TRIGGER core_ingredient_search_rename_trg
+AFTER UPDATE OF name ON core_ingredient
+FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+EXECUTE PROCEDURE core_recipe_search_ingredient_renamed();
+'''.format(functions=search.SEARCH_FUNCTION)
+
+# copies the catalog names back when migrating backwards
+RESTORE_NAMES = '''
+UPDATE core_ingredient i SET name = c.name
+FROM core_catalogingredient c
+WHERE c.id = i.catalog_id
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_link_ingredient_catalog'),
+    ]
+
+    operations = [
+        migrations.RunSQL(LINK_REMAINING, migrations.RunSQL.noop),
+        migrations.RunSQL(CATALOG_SEARCH, NAME_SEARCH),
+        migrations.RemoveConstraint(
+            model_name='ingredient',
+            name='core_ingredient_user_name_uniq',
+        ),
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='core_ingredient_user_name_idx',
+        ),
+        # nullable first, so migrating backwards adds the column back
+        # empty and then fills it
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(max_length=255, null=True),
+        ),
+        migrations.RunSQL(migrations.RunSQL.noop, RESTORE_NAMES),
+        migrations.RemoveField(
+            model_name='ingredient',
+            name='name',
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='catalog',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='ingredients', to='core.CatalogIngredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'catalog'), name='core_ingredient_user_catalog_uniq'),
+        ),
+    ]
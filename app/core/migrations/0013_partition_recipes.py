@@ -0,0 +1,27 @@
+# Generated by Django 3.0.14 on 2026-10-18 22:10
+
+from django.conf import settings
+from django.db import migrations
+from core.partitions import partition_recipe_tables
+
+
+def partition(apps, schema_editor):
+    """Partition the recipe tables when RECIPE_PARTITIONS is set, changing
+    it after this migration ran doesn't repartition them"""
+    if settings.RECIPE_PARTITIONS > 1:
+        partition_recipe_tables(
+            schema_editor.connection, settings.RECIPE_PARTITIONS
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_remove_ingredient_name'),
+    ]
+
+    operations = [
+        # the partitioned tables work with every earlier migration, so
+        # they are left as they are when migrating backwards
+        migrations.RunPython(partition, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 from django.conf import settings
+from core.signals import collection_bumped
 
 
 class UserManager(BaseUserManager):
@@ -39,25 +44,287 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
-class Tag(models.Model):
+class RecipeCountMixin:
+    """For models with a recipe_count maintained by database triggers,
+    saving an existing row doesn't write back the count it was loaded
+    with"""
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'recipe_count'
+            ]
+        super().save(*args, **kwargs)
+
+
+# matches the rows of all users, or of the user_ids parameter
+USER_FILTER = '(%(everyone)s OR {column} = ANY(%(user_ids)s))'
+
+RECONCILE_COUNT_SQL = '''
+UPDATE {table} o
+SET recipe_count = c.recipe_count
+FROM (
+    SELECT o.id, count(l.{column}) AS recipe_count
+    FROM {table} o
+    LEFT JOIN {through} l ON l.{column} = o.id
+    WHERE {user_filter}
+    GROUP BY o.id
+) c
+WHERE o.id = c.id AND o.recipe_count <> c.recipe_count
+RETURNING o.id
+'''
+
+
+# inserts the names a user doesn't have yet, in a consistent order so
+# concurrent inserts of the same names wait on each other instead of
+# deadlocking
+INSERT_NAMES_SQL = (
+    'INSERT INTO {table} (user_id, name) '
+    'SELECT %s, name FROM unnest(%s::varchar[]) AS n(name) ORDER BY name '
+    'ON CONFLICT (user_id, name) DO NOTHING'
+)
+
+
+class RecipeCountManager(models.Manager):
+    """Manager of tags and ingredients, whose recipe_count counts the
+    recipes linked to each row"""
+
+    def get_or_create_names(self, user, names):
+        """Create the names user doesn't have yet with one insert and
+        return a queryset of the rows of all of them.
+
+        Rows inserted by a concurrent writer are skipped by the
+        (user, name) unique constraint and returned like any other"""
+        names = sorted(set(names))
+        if names:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    INSERT_NAMES_SQL.format(
+                        table=connection.ops.quote_name(
+                            self.model._meta.db_table
+                        )
+                    ),
+                    [user.pk, names]
+                )
+
+        return self.filter(user=user, name__in=names)
+
+    def with_actual_count(self):
+        """Annotate actual_recipe_count, counted from the through table"""
+        through = self.model.recipe_set.through
+        column = self.model._meta.model_name
+        links = through.objects.filter(**{column: OuterRef('pk')}).values(
+            column
+        ).annotate(recipe_count=Count('*')).values('recipe_count')
+
+        return self.annotate(
+            actual_recipe_count=Coalesce(Subquery(links), 0)
+        )
+
+    def drifted(self):
+        """Return the rows whose recipe_count is wrong"""
+        return self.with_actual_count().exclude(
+            recipe_count=F('actual_recipe_count')
+        )
+
+    def reconcile(self, user_ids=None):
+        """Correct the recipe_count of every drifted row of the given users,
+        or everyone, and return the ids that were corrected"""
+        field = self.model.recipe_set.field
+        sql = RECONCILE_COUNT_SQL.format(
+            table=self.model._meta.db_table,
+            through=field.m2m_db_table(),
+            column=field.m2m_reverse_name(),
+            user_filter=USER_FILTER.format(column='o.user_id'),
+        )
+        params = {
+            'everyone': user_ids is None,
+            'user_ids': list(user_ids or ()),
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            # hold off link changes so none lands between count and update
+            cursor.execute('LOCK TABLE {} IN SHARE MODE'.format(
+                field.m2m_db_table()
+            ))
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+# adds the names the catalog doesn't have yet, ordered like the names
+# inserts above, then reads the ids of all of them
+INSERT_CATALOG_NAMES_SQL = [
+    'INSERT INTO {table} (name) '
+    'SELECT name FROM unnest(%s::varchar[]) AS n(name) ORDER BY name '
+    'ON CONFLICT (name) DO NOTHING',
+    'SELECT name, id FROM {table} WHERE name = ANY(%s)',
+]
+
+# adds the catalog names a user doesn't have an ingredient of yet
+INSERT_INGREDIENTS_SQL = (
+    'INSERT INTO {table} (user_id, catalog_id) '
+    'SELECT %s, catalog_id '
+    'FROM unnest(%s::integer[]) AS c(catalog_id) ORDER BY catalog_id '
+    'ON CONFLICT (user_id, catalog_id) DO NOTHING'
+)
+
+
+class CatalogIngredientManager(models.Manager):
+
+    def get_ids(self, names):
+        """Return a map of each name to the id of its catalog row, adding
+        the names the catalog doesn't have yet with one insert"""
+        names = sorted(set(names))
+        if not names:
+            return {}
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            for sql in INSERT_CATALOG_NAMES_SQL:
+                cursor.execute(sql.format(table=table), [names])
+
+            return dict(cursor.fetchall())
+
+
+class CatalogIngredient(models.Model):
+    """Ingredient name, stored once however many users have an ingredient
+    of that name"""
+    name = models.CharField(max_length=255, unique=True)
+
+    objects = CatalogIngredientManager()
+
+    def __str__(self):
+        return self.name
+
+
+class IngredientManager(RecipeCountManager):
+    """Manager of ingredients, which read their name from the catalog"""
+
+    def get_queryset(self):
+        return super().get_queryset().annotate(name=F('catalog__name'))
+
+    def get_or_create_names(self, user, names):
+        """Create the names user doesn't have yet, and the catalog rows of
+        those no one has, with one insert each and return a queryset of
+        the rows of all of them.
+
+        Rows inserted by a concurrent writer are skipped by the
+        (user, catalog) unique constraint and returned like any other"""
+        catalog_ids = sorted(
+            CatalogIngredient.objects.get_ids(names).values()
+        )
+        if catalog_ids:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    INSERT_INGREDIENTS_SQL.format(
+                        table=connection.ops.quote_name(
+                            self.model._meta.db_table
+                        )
+                    ),
+                    [user.pk, catalog_ids]
+                )
+
+        return self.filter(user=user, catalog_id__in=catalog_ids)
+
+
+class Tag(RecipeCountMixin, models.Model):
     """Tag to be used for a recipe"""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # number of recipes using the tag, maintained by triggers installed in
+    # migration 0008
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    objects = RecipeCountManager()
+
+    class Meta:
+        # matches the per user listing, ordered by name then id
+        indexes = [
+            models.Index(
+                fields=['user', 'name', 'id'],
+                name='core_tag_user_name_idx'
+            ),
+            models.Index(
+                fields=['user', '-recipe_count', 'id'],
+                name='core_tag_user_count_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq'
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
-    """ingredients to be used in a recipe"""
-    name = models.CharField(max_length=255)
+class Ingredient(RecipeCountMixin, models.Model):
+    """ingredients to be used in a recipe, named by a catalog row shared
+    with the other users' ingredients of the same name"""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # only looked up with the user, by the unique constraint below
+    catalog = models.ForeignKey(
+        CatalogIngredient,
+        on_delete=models.PROTECT,
+        related_name='ingredients',
+        db_index=False,
+    )
+    # number of recipes using the ingredient, maintained by triggers
+    # installed in migration 0008
+    recipe_count = models.IntegerField(default=0, editable=False)
+
+    objects = IngredientManager()
+
+    # the name read with the row or assigned, see name
+    _name = None
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-recipe_count', 'id'],
+                name='core_ingredient_user_count_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'catalog'],
+                name='core_ingredient_user_catalog_uniq'
+            ),
+        ]
+
+    @property
+    def name(self):
+        """The catalog name, which the manager's querysets annotate. A name
+        assigned, or given to the constructor, links the ingredient to its
+        catalog row when it is saved"""
+        if self._name is None and self.catalog_id is not None:
+            self._name = self.catalog.name
+
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = name
+
+    def save(self, *args, **kwargs):
+        if self._name is not None:
+            self.catalog_id = CatalogIngredient.objects.get_ids(
+                [self._name]
+            )[self._name]
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # read from the catalog again, the base manager doesn't annotate it
+        self._name = None
 
     def __str__(self):
         return self.name
@@ -75,6 +342,212 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
+    # weighted title, tag and ingredient names, maintained by triggers
+    # installed in migration 0007
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # text search configuration the search_vector triggers use
+    search_config = 'english'
+
+    class Meta:
+        # the table is hash partitioned by user when RECIPE_PARTITIONS is
+        # set, see core.partitions
+        indexes = [
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='core_recipe_user_title_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class CollectionVersionManager(models.Manager):
+
+    def get_versions(self, user, resources):
+        """Return the current version of each resource with one query,
+        resources that were never written are at version 0"""
+        versions = dict.fromkeys(resources, 0)
+        versions.update(self.filter(
+            user=user,
+            resource__in=resources
+        ).values_list('resource', 'version'))
+
+        return versions
+
+    def bump(self, user, *resources):
+        """Increment the version of each resource in one upsert and return
+        the new versions"""
+        values = ', '.join(['(%s, %s, 1)'] * len(resources))
+        params = [param for resource in resources
+                  for param in (user.pk, resource)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (user_id, resource, version) '
+                'VALUES {values} '
+                'ON CONFLICT (user_id, resource) '
+                'DO UPDATE SET version = {table}.version + 1 '
+                'RETURNING resource, version'.format(
+                    table=self.model._meta.db_table,
+                    values=values,
+                ),
+                params
+            )
+            versions = dict(cursor.fetchall())
+
+        collection_bumped.send(
+            sender=self.model, user=user, versions=versions
+        )
+
+        return versions
+
+
+class CollectionVersion(models.Model):
+    """Version of one of a user's collections, bumped on every write"""
+    RECIPES = 'recipes'
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
+    RESOURCE_CHOICES = [
+        (RECIPES, 'Recipes'),
+        (TAGS, 'Tags'),
+        (INGREDIENTS, 'Ingredients'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    resource = models.CharField(max_length=32, choices=RESOURCE_CHOICES)
+    version = models.BigIntegerField(default=0)
+
+    objects = CollectionVersionManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'resource'],
+                name='core_collectionversion_user_resource_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return '{} {} v{}'.format(self.user_id, self.resource, self.version)
+
+
+# rebuilds the tables maintained by the migration 0008 triggers
+REBUILD_STATS_SQL = [
+    'DELETE FROM core_recipestats WHERE ' + USER_FILTER.format(
+        column='user_id'
+    ),
+    '''
+    INSERT INTO core_recipestats (user_id, recipe_count, tag_count,
+        ingredient_count, price_sum, time_minutes_sum)
+    SELECT u.id,
+           coalesce(r.recipe_count, 0),
+           (SELECT count(*) FROM core_tag t WHERE t.user_id = u.id),
+           (SELECT count(*) FROM core_ingredient i WHERE i.user_id = u.id),
+           coalesce(r.price_sum, 0),
+           coalesce(r.time_minutes_sum, 0)
+    FROM core_user u
+    LEFT JOIN (
+        SELECT user_id, count(*) AS recipe_count, sum(price) AS price_sum,
+               sum(time_minutes) AS time_minutes_sum
+        FROM core_recipe
+        GROUP BY user_id
+    ) r ON r.user_id = u.id
+    WHERE ''' + USER_FILTER.format(column='u.id'),
+    'DELETE FROM core_recipevaluecount WHERE ' + USER_FILTER.format(
+        column='user_id'
+    ),
+    '''
+    INSERT INTO core_recipevaluecount (user_id, field, value, count)
+    SELECT user_id, 'price', price, count(*)
+    FROM core_recipe
+    WHERE ''' + USER_FILTER.format(column='user_id') + '''
+    GROUP BY user_id, price
+    UNION ALL
+    SELECT user_id, 'time_minutes', time_minutes, count(*)
+    FROM core_recipe
+    WHERE ''' + USER_FILTER.format(column='user_id') + '''
+    GROUP BY user_id, time_minutes
+    ''',
+]
+
+
+class RecipeStatsManager(models.Manager):
+
+    def rebuild(self, user_ids=None):
+        """Recompute the stats, value counts and tag and ingredient
+        recipe counts of the given users, or everyone, from scratch"""
+        everyone = user_ids is None
+        params = {'everyone': everyone, 'user_ids': list(user_ids or ())}
+        with transaction.atomic(), connection.cursor() as cursor:
+            # block writers so no change is missed while rebuilding
+            cursor.execute(
+                'LOCK TABLE core_recipe, core_tag, core_ingredient, '
+                'core_recipe_tags, core_recipe_ingredients IN SHARE MODE'
+            )
+            for statement in REBUILD_STATS_SQL:
+                cursor.execute(statement, params)
+            Tag.objects.reconcile(user_ids)
+            Ingredient.objects.reconcile(user_ids)
+
+
+class RecipeStats(models.Model):
+    """Running totals of a user's recipes, tags and ingredients,
+    maintained by triggers installed in migration 0008"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    recipe_count = models.IntegerField(default=0)
+    tag_count = models.IntegerField(default=0)
+    ingredient_count = models.IntegerField(default=0)
+    price_sum = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0
+    )
+    time_minutes_sum = models.BigIntegerField(default=0)
+
+    objects = RecipeStatsManager()
+
+    def __str__(self):
+        return '{} {} recipes'.format(self.user_id, self.recipe_count)
+
+
+class RecipeValueCount(models.Model):
+    """Number of a user's recipes with each price or time_minutes value,
+    maintained by triggers installed in migration 0008. Rows can be left
+    with a count of 0"""
+    PRICE = 'price'
+    TIME_MINUTES = 'time_minutes'
+    FIELD_CHOICES = [
+        (PRICE, 'Price'),
+        (TIME_MINUTES, 'Time minutes'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    field = models.CharField(max_length=16, choices=FIELD_CHOICES)
+    value = models.DecimalField(max_digits=12, decimal_places=2)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'field', 'value'],
+                name='core_recipevaluecount_user_field_value_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return '{} {}={} x{}'.format(
+            self.user_id, self.field, self.value, self.count
+        )
@@ -0,0 +1,144 @@
+"""Converts the recipe tables to Postgres hash partitioning.
+
+core_recipe is partitioned by user_id, so the per user queries of the
+recipe endpoints only read one partition. The tag and ingredient through
+tables don't have the user, and are partitioned by recipe_id so their
+lookups by recipe prune instead. Every table keeps its name, columns,
+indexes, constraints and triggers, so the models and earlier migrations
+are unchanged."""
+
+# (table, partition key) in the order they are converted
+RECIPE_TABLES = [
+    ('core_recipe', 'user_id'),
+    ('core_recipe_tags', 'recipe_id'),
+    ('core_recipe_ingredients', 'recipe_id'),
+]
+
+# pg_trigger.tgtype bits
+TRIGGER_TYPE_ROW = 1
+TRIGGER_TYPE_BEFORE = 2
+
+# replaces the through table foreign keys to core_recipe, which can't
+# reference a partitioned table without the partition key, so deleting
+# recipes outside of the ORM doesn't leave their links behind
+DELETE_LINKS = '''
+CREATE OR REPLACE FUNCTION core_recipe_links_deleted()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM core_recipe_tags
+    WHERE recipe_id IN (SELECT id FROM old_rows);
+    DELETE FROM core_recipe_ingredients
+    WHERE recipe_id IN (SELECT id FROM old_rows);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER core_recipe_links_del_trg
+AFTER DELETE ON core_recipe REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_links_deleted();
+'''
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass",
+        [table]
+    )
+    return cursor.fetchone()[0]
+
+
+def partition_table(cursor, table, key, partitions, pg_version):
+    """Replace table by a copy of it hash partitioned by key into
+    partitions tables named table_p0, table_p1 and so on"""
+    cursor.execute('LOCK TABLE {} IN ACCESS EXCLUSIVE MODE'.format(table))
+
+    # everything defined on the table, to recreate under the same names
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('u', 'f', 'c') "
+        "ORDER BY conname",
+        [table]
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i '
+        'WHERE i.indrelid = %s::regclass AND NOT EXISTS ('
+        '    SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid'
+        ') ORDER BY i.indexrelid',
+        [table]
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        'SELECT pg_get_triggerdef(oid), tgtype FROM pg_trigger '
+        'WHERE tgrelid = %s::regclass AND NOT tgisinternal ORDER BY tgname',
+        [table]
+    )
+    triggers = cursor.fetchall()
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    sequence = cursor.fetchone()[0]
+
+    copy = '{}_partitioned'.format(table)
+    cursor.execute(
+        'CREATE TABLE {copy} (LIKE {table} INCLUDING DEFAULTS '
+        'INCLUDING STORAGE) PARTITION BY HASH ({key})'.format(
+            copy=copy, table=table, key=key
+        )
+    )
+    names = ['{}_p{}'.format(table, remainder)
+             for remainder in range(partitions)]
+    for remainder, name in enumerate(names):
+        cursor.execute(
+            'CREATE TABLE {name} PARTITION OF {copy} '
+            'FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})'
+            .format(name=name, copy=copy, modulus=partitions,
+                    remainder=remainder)
+        )
+    cursor.execute('INSERT INTO {} SELECT * FROM {}'.format(copy, table))
+    if sequence:
+        cursor.execute('ALTER SEQUENCE {} OWNED BY {}.id'.format(
+            sequence, copy
+        ))
+    # drops the foreign keys referencing the table too
+    cursor.execute('DROP TABLE {} CASCADE'.format(table))
+    cursor.execute('ALTER TABLE {} RENAME TO {}'.format(copy, table))
+
+    # unique constraints have to include the partition key
+    cursor.execute(
+        'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey '
+        'PRIMARY KEY (id, {key})'.format(table=table, key=key)
+    )
+    for name, definition in constraints:
+        cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} {}'.format(
+            table, name, definition
+        ))
+    for definition in indexes:
+        cursor.execute(definition)
+
+    on_table = ' ON public.{} '.format(table)
+    for definition, tgtype in triggers:
+        # before row triggers can only be created on partitioned tables
+        # from Postgres 13, and are created on each partition before that
+        if pg_version < 130000 and \
+                tgtype & TRIGGER_TYPE_ROW and tgtype & TRIGGER_TYPE_BEFORE:
+            for name in names:
+                cursor.execute(definition.replace(
+                    on_table, ' ON public.{} '.format(name)
+                ))
+        else:
+            cursor.execute(definition)
+
+    cursor.execute('ANALYZE {}'.format(table))
+
+
+def partition_recipe_tables(connection, partitions):
+    """Hash partition the recipe tables into partitions tables each, if
+    they aren't yet. Holds an exclusive lock on each table while its rows
+    are copied, so run it in a maintenance window"""
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor, RECIPE_TABLES[0][0]):
+            return
+        for table, key in RECIPE_TABLES:
+            partition_table(
+                cursor, table, key, partitions, connection.pg_version
+            )
+        cursor.execute(DELETE_LINKS)
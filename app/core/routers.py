@@ -0,0 +1,51 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.authtoken.models import Token
+
+
+# the replica the current request reads from, None to read from the
+# primary. Set by core.middleware.ReplicaRoutingMiddleware
+current_replica = ContextVar('current_replica', default=None)
+
+
+def choose_replica():
+    """Return one of the DATABASE_REPLICAS at random, None if there are
+    none"""
+    if not settings.DATABASE_REPLICAS:
+        return None
+
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def reads_primary(model):
+    """Return whether model is always read from the primary. Credentials
+    are, so a lagging replica can't authenticate a token that was deleted
+    or a user that was deactivated, and have the token cache keep it"""
+    return model is Token or model is get_user_model()
+
+
+class ReplicaRouter:
+    """Send the reads of a request using a replica to it, and every write,
+    any read inside a transaction on the primary and reads of credentials
+    to the primary"""
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica.get()
+        if replica is None or reads_primary(model) or \
+                connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+
+# sent by CollectionVersion.objects.bump with the user and the new version
+# of each bumped resource
+collection_bumped = Signal(providing_args=['user', 'versions'])
@@ -1,7 +1,10 @@
+from io import StringIO
 from unittest.mock import patch
 from django.core.management import call_command
+from django.db import connection
 from django.db.utils import OperationalError
 from django.test import TestCase
+from core.models import Recipe
 
 
 class CommandTests(TestCase):
@@ -30,3 +33,21 @@ class CommandTests(TestCase):
             call_command('wait_for_db')
 
             self.assertEqual(get_item.call_count, 6)
+
+    def test_benchmark_indexes(self):
+        """Test the index benchmark seeds data and restores the indexes"""
+        out = StringIO()
+        call_command(
+            'benchmark_indexes',
+            users=2, recipes=20, tags=5, per_recipe=2, repeat=1,
+            stdout=out
+        )
+
+        self.assertEqual(Recipe.objects.count(), 20)
+        self.assertIn('recipe list', out.getvalue())
+        self.assertIn('before', out.getvalue())
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Recipe._meta.db_table
+            )
+        self.assertIn('core_recipe_user_title_idx', constraints)
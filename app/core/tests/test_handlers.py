@@ -0,0 +1,66 @@
+import json
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from core.handlers import StreamingASGIHandler
+from core.models import Recipe
+
+
+class StreamingASGIHandlerTests(TestCase):
+    """Test streaming responses under ASGI"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        for title in ('Curry', 'Soup'):
+            Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=2
+            )
+        # as the test client does, keep the test transaction's connection
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    @async_to_sync
+    async def get(self, path, query_string):
+        communicator = ApplicationCommunicator(StreamingASGIHandler(), {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': query_string,
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization',
+                 'Token {}'.format(self.token.key).encode('ascii')),
+            ],
+        })
+        await communicator.send_input({'type': 'http.request'})
+        messages = [await communicator.receive_output()]
+        while messages[-1].get('more_body', messages[-1]['type'] ==
+                               'http.response.start'):
+            messages.append(await communicator.receive_output())
+
+        return messages
+
+    def test_stream_export(self):
+        """Test an export that queries while streaming is sent in parts"""
+        messages = self.get(reverse('recipe:recipe-export'), b'format=json')
+
+        start, *parts = messages
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'Content-Type', b'application/json'), start['headers']
+        )
+        body = b''.join(part.get('body', b'') for part in parts)
+        self.assertEqual(
+            [row['title'] for row in json.loads(body)], ['Curry', 'Soup']
+        )
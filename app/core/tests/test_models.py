@@ -63,6 +63,65 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_get_or_create_names(self):
+        """Test only the missing names are created and all are returned"""
+        user = sample_user()
+        vegan = models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(user=sample_user('other@testmail.com'),
+                                  name='Quick')
+
+        with self.assertNumQueries(2):
+            tags = models.Tag.objects.get_or_create_names(
+                user, ['Vegan', 'Quick', 'Quick']
+            )
+            tags = {tag.name: tag for tag in tags}
+
+        self.assertEqual(set(tags), {'Vegan', 'Quick'})
+        self.assertEqual(tags['Vegan'].id, vegan.id)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+    def test_ingredients_share_catalog(self):
+        """Test every user's ingredient of a name is linked to one catalog
+        row, whether created by the ORM or in bulk"""
+        salt = models.Ingredient.objects.create(
+            user=sample_user(), name='Sea salt'
+        )
+        other = sample_user('other@testmail.com')
+
+        with self.assertNumQueries(4):
+            ingredients = {
+                ingredient.name: ingredient
+                for ingredient in models.Ingredient.objects
+                .get_or_create_names(other, ['Sea salt', 'Pepper'])
+            }
+
+        self.assertEqual(set(ingredients), {'Sea salt', 'Pepper'})
+        self.assertEqual(ingredients['Sea salt'].catalog_id, salt.catalog_id)
+        self.assertEqual(models.CatalogIngredient.objects.count(), 2)
+
+    def test_rename_ingredient(self):
+        """Test renaming an ingredient links it to the catalog row of the
+        new name and updates the search vectors of its recipes"""
+        user = sample_user()
+        ingredient = models.Ingredient.objects.create(user=user, name='Salt')
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Soup',
+            time_minutes=5,
+            price=5.00
+        )
+        recipe.ingredients.add(ingredient)
+
+        ingredient.name = 'Saffron'
+        ingredient.save()
+        ingredient.refresh_from_db()
+
+        self.assertEqual(ingredient.name, 'Saffron')
+        self.assertEqual(ingredient.catalog.name, 'Saffron')
+        self.assertTrue(models.Recipe.objects.filter(
+            search_vector='saffron'
+        ).exists())
+
     def test_recipe_str(self):
         """Test the recipe str representation"""
         recipe = models.Recipe.objects.create(
@@ -0,0 +1,89 @@
+import re
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from core.models import Ingredient, Recipe, RecipeStats, Tag
+from core.partitions import partition_recipe_tables
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'Sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def scanned_partitions(queryset):
+    return set(re.findall(r'core_recipe\w*_p\d+', queryset.explain()))
+
+
+class PartitionTests(TestCase):
+    """Test the recipe tables hash partitioned, the conversion is rolled
+    back with the test's transaction. The tables are left as they are when
+    the test database was migrated with RECIPE_PARTITIONS set"""
+
+    def setUp(self):
+        self.partitions = settings.RECIPE_PARTITIONS \
+            if settings.RECIPE_PARTITIONS > 1 else 4
+        partition_recipe_tables(connection, self.partitions)
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com', 'password123'
+        )
+
+    def test_tables_partitioned(self):
+        """Test the recipe and through tables are split into partitions"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT parent.relname, count(*) FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = inhparent "
+                "WHERE parent.relkind = 'p' "
+                "GROUP BY parent.relname"
+            )
+            partitions = dict(cursor.fetchall())
+
+        self.assertEqual(partitions, {
+            'core_recipe': self.partitions,
+            'core_recipe_tags': self.partitions,
+            'core_recipe_ingredients': self.partitions,
+        })
+
+    def test_user_recipes_read_one_partition(self):
+        """Test a user's recipes are read from one partition"""
+        sample_recipe(self.user)
+
+        partitions = scanned_partitions(
+            Recipe.objects.filter(user=self.user)
+        )
+
+        self.assertEqual(len(partitions), 1)
+
+    def test_triggers_kept(self):
+        """Test the counters, stats and search vectors are maintained on
+        the partitioned tables"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Tofu')
+        recipe = sample_recipe(self.user, title='Tofu curry')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+        self.assertEqual(
+            RecipeStats.objects.get(user=self.user).recipe_count, 1
+        )
+        self.assertTrue(
+            Recipe.objects.filter(search_vector='vegan').exists()
+        )
+
+    def test_raw_delete_removes_links(self):
+        """Test deleting recipes outside of the ORM deletes their links"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+
+        Recipe.objects.filter(pk=recipe.pk)._raw_delete(connection.alias)
+
+        self.assertFalse(Recipe.tags.through.objects.exists())
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
@@ -0,0 +1,194 @@
+import time
+from unittest import skipUnless
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, \
+    TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from core.middleware import PIN_COOKIE, PIN_HEADER, \
+    ReplicaRoutingMiddleware
+from core.models import Recipe
+from core.routers import ReplicaRouter, current_replica
+from user.authentication import token_cache
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ReplicaView:
+    replica_reads = True
+
+
+class PrimaryView:
+    pass
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Test choosing the database a request reads from"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def dispatch(self, request, view_class=ReplicaView, status=200):
+        """Return the replica current while the view ran and the
+        response"""
+        seen = []
+
+        def view(request):
+            seen.append(current_replica.get())
+            return HttpResponse(status=status)
+        view.cls = view_class
+
+        def get_response(request):
+            response = middleware.process_view(request, view, (), {})
+            return response or view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+
+        return seen[0], response
+
+    def test_router_reads_from_current_replica(self):
+        """Test reads go to the current replica and writes to the
+        primary"""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Recipe), 'default')
+
+        token = current_replica.set('replica1')
+        try:
+            self.assertEqual(router.db_for_read(Recipe), 'replica1')
+            self.assertEqual(router.db_for_write(Recipe), 'default')
+            self.assertEqual(router.db_for_read(Token), 'default')
+            self.assertEqual(
+                router.db_for_read(get_user_model()), 'default'
+            )
+        finally:
+            current_replica.reset(token)
+
+        self.assertFalse(router.allow_migrate('replica1', 'core'))
+
+    def test_get_reads_from_replica(self):
+        """Test a GET to a replica view reads from a replica, and the
+        replica is unset after the request"""
+        replica, response = self.dispatch(self.factory.get('/'))
+
+        self.assertEqual(replica, 'replica1')
+        self.assertIsNone(current_replica.get())
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_other_views_read_from_primary(self):
+        """Test views without replica_reads read from the primary"""
+        replica, _response = self.dispatch(
+            self.factory.get('/'), view_class=PrimaryView
+        )
+
+        self.assertIsNone(replica)
+
+    def test_write_pins_to_primary(self):
+        """Test a successful write reads from the primary and pins the
+        client with a cookie and a header"""
+        replica, response = self.dispatch(self.factory.post('/'))
+
+        self.assertIsNone(replica)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+        self.assertEqual(
+            response.cookies[PIN_COOKIE].value, response[PIN_HEADER]
+        )
+
+    def test_failed_write_not_pinned(self):
+        """Test a rejected write doesn't pin the client"""
+        _replica, response = self.dispatch(
+            self.factory.post('/'), status=400
+        )
+
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertFalse(response.has_header(PIN_HEADER))
+
+    def test_pinned_client_reads_from_primary(self):
+        """Test clients sending the pin cookie or header read from the
+        primary until it expires"""
+        until = str(time.time() + 5)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = until
+        self.assertIsNone(self.dispatch(request)[0])
+
+        request = self.factory.get('/', HTTP_X_PIN_PRIMARY=until)
+        self.assertIsNone(self.dispatch(request)[0])
+
+        for expired in (time.time() - 1, time.time() + 60, 'invalid'):
+            request = self.factory.get('/', HTTP_X_PIN_PRIMARY=expired)
+            self.assertEqual(self.dispatch(request)[0], 'replica1')
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'set DB_REPLICA_HOSTS to test')
+class ReplicaQueryTests(TransactionTestCase):
+    """Test API requests against a replica alias, which is a mirror of
+    the default database in tests"""
+    databases = '__all__'
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com', 'password123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def replica_queries(self, method, *args, **kwargs):
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with override_settings(DATABASE_REPLICAS=[replica.alias]), \
+                CaptureQueriesContext(replica) as queries:
+            response = getattr(self.client, method)(*args, **kwargs)
+
+        return response, len(queries)
+
+    def test_list_reads_from_replica(self):
+        """Test listing recipes queries the replica"""
+        response, queries = self.replica_queries('get', RECIPES_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(queries, 0)
+
+    def test_reads_own_writes_from_primary(self):
+        """Test a client reads from the primary after creating a recipe,
+        and the replica isn't used by the write"""
+        payload = {'title': 'Toast', 'time_minutes': 5, 'price': '1.00'}
+        response, queries = self.replica_queries(
+            'post', RECIPES_URL, payload
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(queries, 0)
+
+        response, queries = self.replica_queries('get', RECIPES_URL)
+        self.assertEqual(response.data['results'][0]['title'], 'Toast')
+        self.assertEqual(queries, 0)
+
+    def test_deleted_token_read_from_primary(self):
+        """Test a token deleted while a replica is current is looked up on
+        the primary and rejected"""
+        token = Token.objects.create(user=self.user)
+        key = token.key
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        token.delete()
+        token_cache.clear()
+
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with override_settings(DATABASE_REPLICAS=[replica.alias]), \
+                CaptureQueriesContext(replica) as queries:
+            response = client.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse([
+            query for query in queries
+            if 'authtoken_token' in query['sql'] or
+            'core_user' in query['sql']
+        ])
+        self.assertIsNone(token_cache.get(key))
@@ -0,0 +1,110 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from django.conf import settings
+from core.models import CollectionVersion, Ingredient, Tag
+from recipe.indexes import UserIndex, UserIndexes
+
+
+class NameIndex(UserIndex):
+    """A user's tag or ingredient names, case folded and sorted, for type
+    ahead lookups.
+
+    Prefix matches are a bisect into the sorted names. Names containing a
+    string are found with str.find over all of the names joined into one
+    string in order, so the scan stops at the first limit matches, and the
+    offsets of the matches are mapped back to names by a bisect into their
+    start offsets. The index isn't updated in place,
+    any write to the collection bumps its version and the index is
+    rebuilt on its next use"""
+    model = None
+    separator = '\n'
+
+    def __init__(self, versions, rows=()):
+        super().__init__(versions)
+        rows = sorted(
+            (name.casefold().replace(self.separator, ' '), pk)
+            for pk, name in rows
+        )
+        self.names = [name for name, _pk in rows]
+        self.ids = array('q', (pk for _name, pk in rows))
+        self.text = self.separator.join(self.names)
+        self.starts = array('q')
+        offset = 0
+        for name in self.names:
+            self.starts.append(offset)
+            offset += len(name) + 1
+
+    @classmethod
+    def build(cls, user):
+        """Load the index for user with one query"""
+        return cls(
+            CollectionVersion.objects.get_versions(user, cls.resources),
+            cls.model.objects.filter(user=user).values_list(
+                'id', 'name'
+            ).iterator()
+        )
+
+    def prefix(self, prefix, limit):
+        """Return the ids of the first limit names starting with prefix,
+        in name order"""
+        return [
+            self.ids[position]
+            for position in self.prefix_positions(prefix.casefold(), limit)
+        ]
+
+    def prefix_positions(self, prefix, limit):
+        position = bisect_left(self.names, prefix)
+        end = min(position + limit, len(self.names))
+        positions = []
+        while position < end and self.names[position].startswith(prefix):
+            positions.append(position)
+            position += 1
+
+        return positions
+
+    def search(self, query, limit):
+        """Return the ids of the first limit names containing query, those
+        starting with it first, then those with a word starting with it,
+        then the rest, each in name order"""
+        query = query.casefold()
+        if not query or self.separator in query:
+            return []
+
+        positions = self.prefix_positions(query, limit)
+        seen = set(positions)
+        for needle in (' ' + query, query):
+            # the text is in name order, so the first matches found are
+            # the first names, and the scan stops once limit are found
+            offset = self.text.find(needle)
+            while offset != -1 and len(positions) < limit:
+                position = bisect_right(self.starts, offset) - 1
+                if position not in seen:
+                    seen.add(position)
+                    positions.append(position)
+                offset = self.text.find(needle, offset + 1)
+
+        return [self.ids[position] for position in positions]
+
+
+class TagNameIndex(NameIndex):
+    model = Tag
+    resources = (CollectionVersion.TAGS,)
+
+
+class IngredientNameIndex(NameIndex):
+    model = Ingredient
+    resources = (CollectionVersion.INGREDIENTS,)
+
+
+name_indexes = {
+    Tag: UserIndexes(
+        TagNameIndex,
+        settings.NAME_INDEX['MAX_USERS'],
+        settings.NAME_INDEX['TTL'],
+    ),
+    Ingredient: UserIndexes(
+        IngredientNameIndex,
+        settings.NAME_INDEX['MAX_USERS'],
+        settings.NAME_INDEX['TTL'],
+    ),
+}
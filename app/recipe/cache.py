@@ -0,0 +1,64 @@
+from collections import defaultdict
+from django.conf import settings
+from django.http import HttpResponse
+from core.cache import LRUCache
+
+
+class ResponseCache(LRUCache):
+    """LRU of rendered response bodies keyed by their ETag, which already
+    covers the user, collection versions, url and media type. Entries are
+    also indexed by (user id, collection) so a change to a collection can
+    drop them before the next version bump is seen"""
+
+    def __init__(self, max_size, ttl=None, max_bytes=None):
+        super().__init__(max_size, ttl, max_weight=max_bytes)
+        self._collections = defaultdict(set)
+
+    def weigh(self, value):
+        content, content_type, collections = value
+        return len(content)
+
+    def evicted(self, key, value):
+        for collection in value[2]:
+            keys = self._collections.get(collection)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._collections[collection]
+
+    def get_response(self, key):
+        """Return a new response for the cached body of key or None"""
+        value = self.get(key)
+        if value is None:
+            return None
+
+        content, content_type, collections = value
+
+        return HttpResponse(content, content_type=content_type)
+
+    def set_response(self, key, response, user_id, resources):
+        """Cache the rendered body of response for key"""
+        collections = tuple((user_id, resource) for resource in resources)
+        with self._lock:
+            self.set(
+                key, (response.content, response['Content-Type'], collections)
+            )
+            if key in self._data:
+                for collection in collections:
+                    self._collections[collection].add(key)
+
+    def invalidate(self, user_id, *resources):
+        """Drop every cached response that depends on the given
+        collections of a user"""
+        with self._lock:
+            for resource in resources:
+                for key in list(self._collections.get((user_id, resource),
+                                                      ())):
+                    self._remove(key)
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE['MAX_SIZE'],
+    settings.RESPONSE_CACHE['TTL'],
+    settings.RESPONSE_CACHE['MAX_BYTES'],
+)
@@ -0,0 +1,57 @@
+from collections import defaultdict
+from itertools import islice
+from core.models import Recipe
+
+
+def iter_chunks(iterable, size):
+    """Yield lists of up to size items from iterable"""
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def related_names(field_name, recipe_ids):
+    """Return a map of recipe id to the names of its related objects"""
+    field = getattr(Recipe, field_name).field
+    # the related model's manager, which reads ingredient names from the
+    # catalog, joined to the through table
+    recipe = field.related_query_name()
+    names = defaultdict(list)
+    rows = field.related_model.objects.filter(
+        **{recipe + '__in': recipe_ids}
+    ).order_by('name').values_list(recipe, 'name')
+    for recipe_id, related_name in rows:
+        names[recipe_id].append(related_name)
+
+    return names
+
+
+def export_recipes(user, chunk_size):
+    """Yield a dict for each of the user's recipes with its tag and
+    ingredient names.
+
+    Recipes are read through a server side cursor and the names are
+    fetched once per chunk, so memory use depends on chunk_size and not
+    on how many recipes the user has"""
+    recipes = Recipe.objects.filter(user=user).order_by(
+        'title', 'id'
+    ).values_list(
+        'id', 'title', 'time_minutes', 'price', 'link'
+    ).iterator(chunk_size=chunk_size)
+
+    for chunk in iter_chunks(recipes, chunk_size):
+        recipe_ids = [row[0] for row in chunk]
+        tags = related_names('tags', recipe_ids)
+        ingredients = related_names('ingredients', recipe_ids)
+        for recipe_id, title, time_minutes, price, link in chunk:
+            yield {
+                'id': recipe_id,
+                'title': title,
+                'tags': tags[recipe_id],
+                'ingredients': ingredients[recipe_id],
+                'time_minutes': time_minutes,
+                'price': str(price),
+                'link': link,
+            }
@@ -0,0 +1,89 @@
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from core.models import CatalogIngredient, Ingredient
+
+
+def name_max_length(model):
+    """Return the longest name a tag or ingredient can have, ingredients
+    are named by their catalog row"""
+    if model is Ingredient:
+        model = CatalogIngredient
+
+    return model._meta.get_field('name').max_length
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """Validate every submitted primary key with a single IN query.
+
+    Items can also be {"name": ...} objects, which are returned as the
+    name strings after the objects for the primary keys, for the
+    serializer to get or create when it saves"""
+    default_error_messages = {
+        'invalid_name': _('Expected a name of 1 to {max_length} '
+                          'characters.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+
+        # coerce the submitted values first, dropping duplicates but
+        # keeping the order they were sent in
+        pks = []
+        names = []
+        max_length = name_max_length(queryset.model)
+        for item in data:
+            if isinstance(item, dict):
+                name = item.get('name')
+                if not isinstance(name, str) or \
+                        not 0 < len(name.strip()) <= max_length:
+                    self.fail('invalid_name', max_length=max_length)
+                if name.strip() not in names:
+                    names.append(name.strip())
+                continue
+            if child.pk_field is not None:
+                item = child.pk_field.to_internal_value(item)
+            try:
+                pk = pk_field.to_python(item)
+            except ValidationError:
+                child.fail('incorrect_type', data_type=type(item).__name__)
+            if pk is None:
+                child.fail('incorrect_type', data_type=type(item).__name__)
+            if pk not in pks:
+                pks.append(pk)
+
+        objects = queryset.in_bulk(pks) if pks else {}
+        for pk in pks:
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=pk)
+
+        return [objects[pk] for pk in pks] + names
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field limited to objects owned by the request user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
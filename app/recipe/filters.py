@@ -0,0 +1,57 @@
+from django.db.models import Count, Exists, OuterRef
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from core.models import Recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def parse_ids(param, value):
+    """Return the distinct ids in a comma separated query parameter"""
+    try:
+        ids = {int(item) for item in value.split(',') if item.strip()}
+    except ValueError:
+        raise ValidationError({
+            param: _('Expected a comma separated list of ids.')
+        })
+
+    return sorted(ids)
+
+
+def parse_fields(param, value, allowed):
+    """Return the field names in a comma separated query parameter, in the
+    order of allowed"""
+    fields = {item.strip() for item in value.split(',') if item.strip()}
+    unknown = fields.difference(allowed)
+    if unknown:
+        raise ValidationError({
+            param: _('Unknown fields: {}. Expected any of: {}.').format(
+                ', '.join(sorted(unknown)), ', '.join(allowed)
+            )
+        })
+
+    return [field for field in allowed if field in fields]
+
+
+def filter_related(queryset, field_name, ids, match=MATCH_ANY):
+    """Filter recipes linked to any, or all, of the given related ids.
+
+    Any-of is a correlated EXISTS probing the (recipe_id, related_id)
+    unique index of the through table once per recipe. All-of groups the
+    through rows of the wanted ids, read from the (related_id, recipe_id)
+    index, and keeps recipes linked to every one of them. Neither joins
+    the through table into the outer query, so no DISTINCT is needed"""
+    field = Recipe._meta.get_field(field_name)
+    links = field.remote_field.through.objects.filter(
+        **{field.m2m_reverse_field_name() + '__in': ids}
+    )
+
+    if match == MATCH_ALL:
+        # (recipe_id, related_id) is unique, so COUNT(*) counts distinct ids
+        return queryset.filter(id__in=links.values('recipe_id').annotate(
+            matched=Count('*')
+        ).filter(matched=len(ids)).values('recipe_id'))
+
+    return queryset.filter(Exists(links.filter(recipe_id=OuterRef('pk'))))
@@ -0,0 +1,157 @@
+import json
+import time
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+from core.models import CollectionVersion, Tag, Ingredient, Recipe
+from recipe.serializers import RecipeImportSerializer
+from recipe.signals import recipes_imported
+
+
+class RecipeImporter:
+    """Import a user's recipes from newline delimited JSON.
+
+    Lines are consumed one at a time and written in transactional batches
+    of batch_size recipes, each batch costs a fixed number of bulk queries
+    however many tags and ingredients it uses"""
+    relations = (
+        ('tags', Tag),
+        ('ingredients', Ingredient),
+    )
+
+    def __init__(self, user, batch_size=1000, max_errors=100):
+        self.user = user
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.serializer = RecipeImportSerializer()
+        # name to id maps, filled a batch at a time and kept for the import
+        self.ids = {field_name: {} for field_name, _model in self.relations}
+        self.lines = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.seconds = 0
+
+    def run(self, lines):
+        """Import every line and return the report"""
+        start = time.monotonic()
+        batch = []
+        for number, line in enumerate(lines, start=1):
+            self.lines = number
+            if not line.strip():
+                continue
+            try:
+                batch.append((number, json.loads(line)))
+            except ValueError as exc:
+                self.add_error(number, {'non_field_errors': [str(exc)]})
+
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+
+        if batch:
+            self.import_batch(batch)
+        if self.created:
+            # new tags and ingredients can be created from their names
+            CollectionVersion.objects.bump(
+                self.user,
+                CollectionVersion.RECIPES,
+                CollectionVersion.TAGS,
+                CollectionVersion.INGREDIENTS,
+            )
+        self.seconds = time.monotonic() - start
+
+        return self.report()
+
+    def report(self):
+        """Return the counts, errors and throughput of the import"""
+        return {
+            'lines': self.lines,
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.created / self.seconds, 1)
+            if self.seconds else 0,
+        }
+
+    def add_error(self, number, detail):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': number, 'errors': detail})
+
+    def import_batch(self, batch):
+        """Validate a batch of parsed lines and bulk insert the valid ones"""
+        valid = []
+        for number, data in batch:
+            try:
+                valid.append(self.serializer.run_validation(data))
+            except ValidationError as exc:
+                self.add_error(number, exc.detail)
+
+        if not valid:
+            return
+
+        with transaction.atomic():
+            for field_name, model in self.relations:
+                self.resolve_names(field_name, model, valid)
+
+            recipes = Recipe.objects.bulk_create([
+                Recipe(
+                    user=self.user,
+                    title=item['title'],
+                    time_minutes=item['time_minutes'],
+                    price=item['price'],
+                    link=item['link'],
+                )
+                for item in valid
+            ])
+
+            for field_name, _model in self.relations:
+                self.link(field_name, recipes, valid)
+
+        self.created += len(recipes)
+        recipes_imported.send(
+            sender=self.__class__,
+            user=self.user,
+            recipe_ids=[recipe.id for recipe in recipes]
+        )
+
+    def resolve_names(self, field_name, model, items):
+        """Add the ids of every name used in items to the name map,
+        creating the names the user doesn't have yet"""
+        ids = self.ids[field_name]
+        missing = {
+            name for item in items for name in item[field_name]
+            if name not in ids
+        }
+        if not missing:
+            return
+
+        ids.update(model.objects.get_or_create_names(
+            self.user, missing
+        ).values_list('name', 'id'))
+
+    def link(self, field_name, recipes, items):
+        """Insert the through table rows for a batch of recipes with one
+        statement, without building a model instance per row"""
+        field = getattr(Recipe, field_name).field
+        ids = self.ids[field_name]
+        rows = [
+            (recipe.id, related_id)
+            for recipe, item in zip(recipes, items)
+            for related_id in {ids[name] for name in item[field_name]}
+        ]
+        if not rows:
+            return
+
+        recipe_ids, related_ids = zip(*rows)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {} ({}, {}) '
+                'SELECT unnest(%s::integer[]), unnest(%s::integer[])'.format(
+                    field.m2m_db_table(),
+                    field.m2m_column_name(),
+                    field.m2m_reverse_name(),
+                ),
+                [list(recipe_ids), list(related_ids)]
+            )
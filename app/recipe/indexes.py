@@ -0,0 +1,105 @@
+import threading
+from django.core.cache import caches
+from core.cache import LRUCache
+from core.models import CollectionVersion
+
+
+class UserIndex:
+    """Base for in memory indexes over one user's recipes.
+
+    versions holds the versions of resources the index reflects, lock
+    guards in place updates"""
+    resources = ()
+
+    def __init__(self, versions):
+        self.versions = versions
+        self.lock = threading.RLock()
+
+    @classmethod
+    def build(cls, user):
+        raise NotImplementedError
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
+
+class UserIndexes:
+    """LRU of a UserIndex subclass per user, optionally backed by a shared
+    Django cache so other processes can load an index instead of building
+    it.
+
+    Changes made in this process are applied to a loaded index from model
+    signals and its versions advanced as the collections are bumped. A
+    version that moved by more than this process' own bump means another
+    process wrote, and the index is rebuilt on its next use"""
+
+    def __init__(self, index_class, max_users, ttl=None, shared_alias=None,
+                 shared_ttl=None):
+        self.index_class = index_class
+        self.indexes = LRUCache(max_users, ttl)
+        self.shared_alias = shared_alias
+        self.shared_ttl = shared_ttl
+        self.key_prefix = '{}:'.format(index_class.__name__.lower())
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def get(self, user):
+        """Return the up to date index for user"""
+        versions = CollectionVersion.objects.get_versions(
+            user, self.index_class.resources
+        )
+        index = self.indexes.get(user.pk)
+        if index is None and self.shared is not None:
+            index = self.shared.get(self.key_prefix + str(user.pk))
+            if index is not None:
+                self.indexes.set(user.pk, index)
+
+        if index is None or index.versions != versions:
+            index = self.rebuild(user)
+
+        return index
+
+    def rebuild(self, user):
+        """Build the index for user and store it in both tiers"""
+        index = self.index_class.build(user)
+        self.indexes.set(user.pk, index)
+        if self.shared is not None:
+            self.shared.set(
+                self.key_prefix + str(user.pk), index, self.shared_ttl
+            )
+
+        return index
+
+    def loaded(self, user_id):
+        """Return the index of user_id if it is loaded in this process,
+        without checking it is current"""
+        return self.indexes.peek(user_id)
+
+    def bumped(self, user_id, versions):
+        """Advance a loaded index past this process' own version bump"""
+        index = self.loaded(user_id)
+        if index is None:
+            return
+
+        with index.lock:
+            for resource, version in versions.items():
+                if resource not in index.versions:
+                    continue
+                if index.versions[resource] != version - 1:
+                    self.discard(user_id)
+                    return
+                index.versions[resource] = version
+
+    def discard(self, user_id):
+        self.indexes.delete(user_id)
+
+    def clear(self):
+        self.indexes.clear()
@@ -0,0 +1,139 @@
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.functions import Upper
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models import Ingredient, Tag
+from recipe.autocomplete import name_indexes
+from recipe.views import IngredientViewSet, TagViewSet
+
+
+BENCHMARK_EMAIL = 'autocomplete@example.com'
+
+WORDS = [
+    'apple', 'basil', 'butter', 'carrot', 'cheddar', 'chicken', 'chili',
+    'cumin', 'garlic', 'ginger', 'honey', 'lemon', 'lentil', 'mango',
+    'mint', 'mushroom', 'onion', 'paprika', 'pepper', 'potato', 'rice',
+    'salmon', 'spinach', 'tomato', 'vanilla', 'walnut', 'yogurt', 'zucchini',
+]
+
+QUERIES = [
+    ('prefix', 't'),
+    ('prefix', 'to'),
+    ('prefix', 'tomato s'),
+    ('q', 'mat'),
+    ('q', 'ginger 12'),
+    ('q', 'zzz'),
+]
+
+
+class Command(BaseCommand):
+    """Django command to measure tag and ingredient autocomplete latency
+    for a user with many names.
+
+    Seeds the benchmark user with generate_series, so run it against a
+    scratch database"""
+    help = 'Benchmark the autocomplete endpoints with many names per user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--names', type=int, default=100000,
+                            help='tags and ingredients of the user')
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--reseed', action='store_true',
+                            help='delete and recreate the benchmark data')
+
+    def handle(self, *args, **options):
+        user = self.get_or_seed_user(options)
+        limit = options['limit']
+        factory = APIRequestFactory()
+
+        for model, viewset in ((Tag, TagViewSet),
+                               (Ingredient, IngredientViewSet)):
+            indexes = name_indexes[model]
+            indexes.discard(user.pk)
+            start = time.perf_counter()
+            index = indexes.get(user)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                '{}: {} names, index built in {:.1f} ms'.format(
+                    model._meta.verbose_name_plural, len(index.names),
+                    (time.perf_counter() - start) * 1000
+                )
+            ))
+
+            view = viewset.as_view({'get': 'autocomplete'})
+            names = model.objects.filter(user=user)
+            for param, value in QUERIES:
+                if param == 'q':
+                    lookup = index.search
+                    database = names.filter(name__icontains=value)
+                else:
+                    lookup = index.prefix
+                    database = names.filter(name__istartswith=value)
+                database = database.order_by(Upper('name'), 'id')[:limit]
+
+                def request():
+                    request = factory.get('/', {param: value, 'limit': limit})
+                    force_authenticate(request, user=user)
+                    return view(request).render()
+
+                timings = [
+                    ('index', self.measure(
+                        lambda: lookup(value, limit), options['repeat']
+                    )),
+                    ('endpoint', self.measure(request, options['repeat'])),
+                    ('ILIKE scan', self.measure(
+                        lambda: list(database.all()), options['repeat']
+                    )),
+                ]
+                self.stdout.write('  {}={!r}: {}'.format(
+                    param, value, ', '.join(
+                        '{} {:.3f} ms'.format(label, median)
+                        for label, median in timings
+                    )
+                ))
+
+    def measure(self, call, repeat):
+        """Return the median milliseconds of call"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return statistics.median(timings)
+
+    def get_or_seed_user(self, options):
+        """Return the benchmark user, seeding their names if needed"""
+        user, _created = get_user_model().objects.get_or_create(
+            email=BENCHMARK_EMAIL, defaults={'password': '!'}
+        )
+        count = options['names']
+        if not options['reseed'] and all(
+            model.objects.filter(user=user).count() == count
+            for model in (Tag, Ingredient)
+        ):
+            return user
+
+        self.stdout.write('Seeding benchmark data...')
+        with transaction.atomic(), connection.cursor() as cursor:
+            # two words and a number, so prefixes and substrings have many
+            # matches
+            cursor.execute(
+                'SELECT initcap(w[1 + g %% cardinality(w)]) '
+                "|| ' ' || w[1 + (g / 7) %% cardinality(w)] "
+                "|| ' ' || g "
+                'FROM generate_series(1, %s) AS g, '
+                'CAST(%s AS text[]) AS w',
+                [count, WORDS]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+            for model in (Tag, Ingredient):
+                model.objects.filter(user=user).delete()
+                model.objects.get_or_create_names(user, names)
+            cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS('Benchmark data seeded'))
+
+        return user
@@ -0,0 +1,90 @@
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+from core.models import Ingredient, Recipe, Tag
+from recipe import serializers
+from recipe.values import ValuesSerializer
+
+
+class Command(BaseCommand):
+    """Django command to compare serializing a list page with the model
+    serializers and from values() rows"""
+    help = 'Benchmark list serialization with ModelSerializer and ' \
+        'ValuesSerializer, checking both render the same bytes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='user whose recipes are listed')
+        parser.add_argument('--rows', type=int, default=1000,
+                            help='rows per page')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(email=options['email']).first()
+        if user is None:
+            raise CommandError('No user with email ' + options['email'])
+
+        rows = options['rows']
+        related = [
+            Prefetch(field_name, queryset=model.objects.only(
+                'id'
+            ).order_by('id'))
+            for field_name, model in (('tags', Tag),
+                                      ('ingredients', Ingredient))
+        ]
+        pages = [
+            ('recipes', serializers.RecipeSerializer, Recipe.objects.filter(
+                user=user
+            ).order_by('-title', '-id'), related),
+            ('tags', serializers.TagSerializer, Tag.objects.filter(
+                user=user
+            ).order_by('-name', '-id'), []),
+            ('ingredients', serializers.IngredientSerializer,
+             Ingredient.objects.filter(
+                 user=user
+             ).order_by('-name', '-id'), []),
+        ]
+        context = {'recipe_count': True}
+
+        for name, serializer_class, queryset, prefetch in pages:
+            values = ValuesSerializer(serializer_class(context=context))
+
+            def model_path():
+                page = list(queryset.prefetch_related(*prefetch)[:rows])
+                return serializer_class(page, many=True, context=context).data
+
+            def values_path():
+                page = list(values.get_queryset(queryset)[:rows])
+                return values.to_representation(page)
+
+            expected = JSONRenderer().render(model_path())
+            count = len(model_path())
+            if JSONRenderer().render(values_path()) != expected:
+                raise CommandError(name + ': the outputs differ')
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                '{}: {} rows'.format(name, count)
+            ))
+            baseline = None
+            for label, path in (('serializer', model_path),
+                                ('values', values_path)):
+                median = self.measure(path, options['repeat'])
+                baseline = baseline or median
+                self.stdout.write(
+                    '  {}: {:.3f} ms median, {:.2f} us/row, {:.1f}x'.format(
+                        label, median, median * 1000 / max(count, 1),
+                        baseline / median
+                    )
+                )
+
+    def measure(self, path, repeat):
+        """Return the median milliseconds of calling path"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            path()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return statistics.median(timings)
@@ -0,0 +1,38 @@
+import sys
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from recipe.importer import RecipeImporter
+
+
+class Command(BaseCommand):
+    """Django command to import a user's recipes from an NDJSON file"""
+    help = 'Import recipes from newline delimited JSON, "-" reads stdin'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--email', required=True,
+                            help='email of the user to import recipes for')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.RECIPE_IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError('No user with email ' + options['email'])
+
+        importer = RecipeImporter(user, batch_size=options['batch_size'])
+        if options['path'] == '-':
+            report = importer.run(sys.stdin)
+        else:
+            with open(options['path'], 'rb') as lines:
+                report = importer.run(lines)
+
+        for error in report['errors']:
+            self.stderr.write('line {line}: {errors}'.format(**error))
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {created} recipes from {lines} lines with '
+            '{error_count} errors in {seconds}s '
+            '({rows_per_second} rows/sec)'.format(**report)
+        ))
@@ -0,0 +1,28 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core.models import RecipeStats
+
+
+class Command(BaseCommand):
+    """Django command to recompute the recipe stats summary tables"""
+    help = 'Rebuild recipe stats and tag and ingredient recipe counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email',
+                            help='only rebuild the stats of this user')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['email']:
+            user_ids = list(get_user_model().objects.filter(
+                email=options['email']
+            ).values_list('id', flat=True))
+            if not user_ids:
+                raise CommandError('No user with email ' + options['email'])
+
+        start = time.monotonic()
+        RecipeStats.objects.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt recipe stats in {:.3f}s'.format(time.monotonic() - start)
+        ))
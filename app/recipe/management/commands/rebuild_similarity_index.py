@@ -0,0 +1,48 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from recipe.similarity import similarity_indexes
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the similar recipes index of users"""
+    help = 'Rebuild the similar recipes index of every user with recipes ' \
+        'and store it in the shared cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email',
+                            help='only rebuild the index of this user')
+
+    def handle(self, *args, **options):
+        # a local memory cache goes away with this process, so no server
+        # would ever load the rebuilt indexes
+        shared = similarity_indexes.shared
+        if shared is None or isinstance(shared, LocMemCache):
+            raise CommandError(
+                "SIMILARITY_INDEX['SHARED_ALIAS'] must name a cache shared "
+                'between processes'
+            )
+
+        users = get_user_model().objects.filter(
+            recipe__isnull=False
+        ).distinct().order_by('id')
+        if options['email']:
+            users = get_user_model().objects.filter(email=options['email'])
+            if not users:
+                raise CommandError('No user with email ' + options['email'])
+
+        start = time.monotonic()
+        count = 0
+        for user in users.iterator():
+            index = similarity_indexes.rebuild(user)
+            count += 1
+            self.stdout.write('{}: {} recipes'.format(
+                user.email, len(index.vectors)
+            ))
+
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt {} indexes in {:.3f}s'.format(
+                count, time.monotonic() - start
+            )
+        ))
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Ingredient, Tag
+
+
+class Command(BaseCommand):
+    """Django command to find and fix drifted tag and ingredient
+    recipe_count counters"""
+    help = 'Report tags and ingredients whose recipe_count is wrong, and ' \
+        'correct them with --fix'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='correct the drifted counters')
+        parser.add_argument('--email',
+                            help='only check the counters of this user')
+        parser.add_argument('--show', type=int, default=20,
+                            help='number of drifted rows to list per model')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['email']:
+            user_ids = list(get_user_model().objects.filter(
+                email=options['email']
+            ).values_list('id', flat=True))
+            if not user_ids:
+                raise CommandError('No user with email ' + options['email'])
+
+        drifted = 0
+        for model in (Tag, Ingredient):
+            rows = model.objects.drifted()
+            if user_ids is not None:
+                rows = rows.filter(user_id__in=user_ids)
+            rows = rows.order_by('id').values_list(
+                'id', 'recipe_count', 'actual_recipe_count'
+            )
+
+            count = rows.count()
+            drifted += count
+            label = model._meta.verbose_name_plural
+            self.stdout.write('{}: {} drifted'.format(label, count))
+            for pk, stored, actual in rows[:options['show']]:
+                self.stdout.write('  {} {}: recipe_count {} actual {}'.format(
+                    model._meta.verbose_name, pk, stored, actual
+                ))
+
+            if options['fix'] and count:
+                fixed = model.objects.reconcile(user_ids)
+                self.stdout.write(self.style.SUCCESS(
+                    '{}: fixed {}'.format(label, len(fixed))
+                ))
+
+        if drifted and not options['fix']:
+            self.stdout.write(self.style.WARNING(
+                'Run with --fix to correct the counters'
+            ))
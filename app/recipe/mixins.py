@@ -0,0 +1,125 @@
+import hashlib
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from core.models import CollectionVersion
+from recipe.cache import response_cache
+from recipe.values import ValuesSerializer
+
+
+class VersionedCollectionMixin:
+    """Tag reads of a user's collection with a weak ETag built from its
+    version and answer a matching If-None-Match with 304 Not Modified
+    before the collection is queried. Writes bump the version"""
+    collection = None
+
+    def get_etag_resources(self):
+        """Return the collections the response content depends on"""
+        return (self.collection,)
+
+    def get_etag(self, request):
+        """Return a weak ETag for the user, collection versions, url and
+        media type of the request"""
+        resources = self.get_etag_resources()
+        versions = CollectionVersion.objects.get_versions(
+            request.user, resources
+        )
+        key = '{}|{}|{}|{}'.format(
+            request.user.pk,
+            ','.join(str(versions[resource]) for resource in resources),
+            request.get_full_path(),
+            request.accepted_media_type,
+        )
+
+        return 'W/"{}"'.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        """Return 304 if the client's copy is current, else call handler"""
+        etag = self.get_etag(request)
+        # weak comparison, the W/ prefix is ignored on both sides
+        client_etags = {
+            tag[2:] if tag.startswith('W/') else tag
+            for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        }
+        if etag[2:] in client_etags or '*' in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.fresh_response(
+                etag, request, handler, *args, **kwargs
+            )
+
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+
+        return response
+
+    def fresh_response(self, etag, request, handler, *args, **kwargs):
+        """Return the full response for a request the client's copy
+        doesn't match"""
+        return handler(request, *args, **kwargs)
+
+    def bump_version(self, *resources):
+        """Mark the given collections, by default this one, as changed"""
+        CollectionVersion.objects.bump(
+            self.request.user, *(resources or (self.collection,))
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Return the collection, or 304 if the client's copy is current"""
+        return self.conditional_response(
+            request, super().list, *args, **kwargs
+        )
+
+
+class CachedListMixin:
+    """Serve repeated list requests from the rendered bytes of an earlier
+    response with the same ETag. Use before VersionedCollectionMixin"""
+
+    def fresh_response(self, etag, request, handler, *args, **kwargs):
+        if self.action != 'list':
+            return super().fresh_response(
+                etag, request, handler, *args, **kwargs
+            )
+
+        response = response_cache.get_response(etag)
+        if response is not None:
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().fresh_response(
+            etag, request, handler, *args, **kwargs
+        )
+        if response.status_code == status.HTTP_200_OK:
+            # render now so the body can be stored, dispatch won't render
+            # the response again
+            response = self.finalize_response(request, response)
+            response.render()
+            response_cache.set_response(
+                etag, response, request.user.pk, self.get_etag_resources()
+            )
+        response['X-Cache'] = 'MISS'
+
+        return response
+
+
+class ValuesListMixin:
+    """Serve list actions from values() rows with a ValuesSerializer,
+    falling back to the serializer for fields it can't read. Use after
+    VersionedCollectionMixin"""
+
+    def list(self, request, *args, **kwargs):
+        values = ValuesSerializer(self.get_serializer())
+        if not values.supported:
+            return super().list(request, *args, **kwargs)
+
+        queryset = values.get_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                values.to_representation(page)
+            )
+
+        return Response(values.to_representation(list(queryset)))
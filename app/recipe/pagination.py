@@ -0,0 +1,194 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginate a queryset by its (sort key, id) ordering using opaque
+    cursors, so every page is a single indexed range scan with no OFFSET
+    and no COUNT(*)"""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        position, reverse = self.decode_cursor(request)
+
+        if position is not None:
+            position = self.to_python(queryset, position)
+            queryset = queryset.filter(self.keyset_filter(position, reverse))
+        if reverse:
+            queryset = queryset.reverse()
+
+        # fetch one extra row to find out if there is another page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+
+        return results
+
+    def paginate_ranked(self, request, fetch, fields):
+        """Paginate results ranked in memory instead of by a queryset.
+
+        fetch(after, limit) returns up to limit rows, dicts with the
+        integer fields they are ordered by ascending, following the
+        position after or from the first when it is None. Only next links
+        are given"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = [(field, False) for field in fields]
+        position, reverse = self.decode_cursor(request)
+        if reverse or position is not None and not all(
+            type(value) is int for value in position
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        results = fetch(position, self.page_size + 1)
+        self.has_next = len(results) > self.page_size
+        self.has_previous = False
+        self.page = results[:self.page_size]
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """Return the requested page size, capped at MAX_PAGE_SIZE"""
+        page_size = api_settings.PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+
+        if requested > 0:
+            page_size = min(requested, settings.MAX_PAGE_SIZE)
+
+        return page_size
+
+    def get_ordering(self, queryset):
+        """Return the ordering of the queryset as (field, descending) pairs"""
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        assert ordering and ordering[-1].lstrip('-') in ('id', 'pk'), (
+            'KeysetPagination requires a queryset ordered with `id` as the '
+            'final tie breaker, got {}'.format(ordering)
+        )
+
+        return [(field.lstrip('-'), field.startswith('-'))
+                for field in ordering]
+
+    def to_python(self, queryset, position):
+        """Convert a decoded position to the types of the fields, or the
+        annotations, it is compared with, so a tampered cursor is a 404
+        rather than a database error"""
+        annotations = queryset.query.annotations
+        opts = queryset.model._meta
+        converted = []
+        for field, value in zip(self.fields, position):
+            if field in annotations:
+                model_field = annotations[field].output_field
+            else:
+                model_field = opts.pk if field == 'pk' else \
+                    opts.get_field(field)
+            try:
+                value = model_field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            converted.append(value)
+
+        return converted
+
+    def keyset_filter(self, position, reverse):
+        """Build the filter selecting rows after (or before) a position"""
+        condition = Q()
+        for index, (field, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{'{}__{}'.format(field, lookup): position[index]})
+            for previous in range(index):
+                step &= Q(**{self.ordering[previous][0]: position[previous]})
+            condition |= step
+
+        return condition
+
+    @property
+    def fields(self):
+        return [field for field, _descending in self.ordering]
+
+    def get_position(self, row):
+        """Return the sort key of a model instance or values() row"""
+        if isinstance(row, dict):
+            return [row[field] for field in self.fields]
+
+        return [getattr(row, field) for field in self.fields]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def decode_cursor(self, request):
+        """Return the (position, reverse) pair encoded in the cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor['r'])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        """Return a url with the position encoded as an opaque cursor"""
+        cursor = json.dumps({'p': position, 'r': int(reverse)}, default=str)
+        encoded = urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+
+        return replace_query_param(url, self.cursor_query_param, encoded)
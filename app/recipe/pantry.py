@@ -0,0 +1,159 @@
+from django.conf import settings
+from core.models import CollectionVersion, Recipe
+from recipe.indexes import UserIndex, UserIndexes
+
+
+class PantryIndex(UserIndex):
+    """A user's recipes as bitsets over their ingredients.
+
+    Each ingredient is given a bit position and each recipe the OR of the
+    bits of its ingredients, so the ingredients a recipe is missing from a
+    pantry are one AND NOT of two integers"""
+    resources = (CollectionVersion.RECIPES, CollectionVersion.INGREDIENTS)
+
+    def __init__(self, versions):
+        super().__init__(versions)
+        self.bits = {}
+        self.positions = {}
+        self.ingredient_ids = []
+        self.free_positions = []
+
+    @classmethod
+    def build(cls, user):
+        """Load the index for user with two queries"""
+        # read the versions first, a write racing the load leaves the index
+        # behind the database and it is rebuilt on the next request
+        index = cls(CollectionVersion.objects.get_versions(
+            user, cls.resources
+        ))
+        for recipe_id in Recipe.objects.filter(
+            user=user
+        ).values_list('id', flat=True).iterator():
+            index.bits[recipe_id] = 0
+
+        links = Recipe.ingredients.through.objects.filter(recipe__user=user)
+        bits = index.bits
+        positions = index.positions
+        for recipe_id, ingredient_id in links.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            position = positions.get(ingredient_id)
+            if position is None:
+                position = index.allocate(ingredient_id)
+            bits[recipe_id] |= 1 << position
+
+        return index
+
+    def mask(self, ingredient_ids, allocate=True):
+        """Return the bitset of ingredient_ids, giving new ingredients a
+        position unless allocate is False"""
+        bits = 0
+        with self.lock:
+            for ingredient_id in ingredient_ids:
+                position = self.positions.get(ingredient_id)
+                if position is None:
+                    if not allocate:
+                        continue
+                    position = self.allocate(ingredient_id)
+                bits |= 1 << position
+
+        return bits
+
+    def allocate(self, ingredient_id):
+        if self.free_positions:
+            position = self.free_positions.pop()
+            self.ingredient_ids[position] = ingredient_id
+        else:
+            position = len(self.ingredient_ids)
+            self.ingredient_ids.append(ingredient_id)
+        self.positions[ingredient_id] = position
+
+        return position
+
+    def unpack(self, bits):
+        """Return the ingredient ids of a bitset"""
+        ingredient_ids = []
+        position = 0
+        while bits:
+            if bits & 1:
+                ingredient_ids.append(self.ingredient_ids[position])
+            bits >>= 1
+            position += 1
+
+        return ingredient_ids
+
+    def set_recipe(self, recipe_id, ingredient_ids=()):
+        with self.lock:
+            self.bits[recipe_id] = self.mask(ingredient_ids)
+
+    def discard_recipe(self, recipe_id):
+        with self.lock:
+            self.bits.pop(recipe_id, None)
+
+    def add_ingredients(self, recipe_ids, ingredient_ids):
+        """Link every recipe in recipe_ids to every ingredient"""
+        with self.lock:
+            bits = self.mask(ingredient_ids)
+            for recipe_id in recipe_ids:
+                self.bits[recipe_id] = self.bits.get(recipe_id, 0) | bits
+
+    def remove_ingredients(self, recipe_ids, ingredient_ids):
+        """Unlink the ingredients from the recipes, recipe_ids None for
+        all of them"""
+        with self.lock:
+            bits = self.mask(ingredient_ids, allocate=False)
+            if recipe_ids is None:
+                recipe_ids = list(self.bits)
+            for recipe_id in recipe_ids:
+                if recipe_id in self.bits:
+                    self.bits[recipe_id] &= ~bits
+
+    def discard_ingredient(self, ingredient_id):
+        """Unlink a deleted ingredient and free its position"""
+        with self.lock:
+            self.remove_ingredients(None, [ingredient_id])
+            position = self.positions.pop(ingredient_id, None)
+            if position is not None:
+                self.ingredient_ids[position] = None
+                self.free_positions.append(position)
+
+    def match(self, ingredient_ids, max_missing=0, limit=None, after=None):
+        """Return (missing count, missing bits, recipe id) for the recipes
+        missing at most max_missing ingredients from ingredient_ids,
+        fewest missing first and then by id, starting after the (missing
+        count, recipe id) position after"""
+        pantry = self.mask(ingredient_ids, allocate=False)
+        # no recipe can miss more ingredients than the user has
+        max_missing = min(max_missing, len(self.ingredient_ids))
+        after = tuple(after) if after is not None else (-1, 0)
+        buckets = [[] for _count in range(max_missing + 1)]
+        with self.lock:
+            for recipe_id, bits in self.bits.items():
+                missing = bits & ~pantry
+                # clear the lowest set bit until none are left, giving up
+                # once more than max_missing have been cleared
+                remaining = missing
+                count = 0
+                while remaining and count < max_missing:
+                    remaining &= remaining - 1
+                    count += 1
+                if not remaining and (count, recipe_id) > after:
+                    buckets[count].append((recipe_id, missing))
+
+        matches = []
+        for count, bucket in enumerate(buckets):
+            bucket.sort()
+            matches.extend(
+                (count, missing, recipe_id) for recipe_id, missing in bucket
+            )
+            if limit is not None and len(matches) >= limit:
+                return matches[:limit]
+
+        return matches
+
+
+pantry_indexes = UserIndexes(
+    PantryIndex,
+    settings.PANTRY_INDEX['MAX_USERS'],
+    settings.PANTRY_INDEX['TTL'],
+)
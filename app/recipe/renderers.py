@@ -0,0 +1,128 @@
+import csv
+import json
+from collections.abc import Iterator
+from io import StringIO
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class StreamingRenderer(BaseRenderer):
+    """Renderer that can also encode an iterable of rows incrementally"""
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b''.join(self.iter_render(data))
+
+    def iter_render(self, rows):
+        """Yield the encoded rows one chunk at a time"""
+        raise NotImplementedError('.iter_render() must be implemented')
+
+    @staticmethod
+    def as_rows(data):
+        # error responses are a single dict rather than a row iterable
+        if isinstance(data, dict):
+            return [data]
+
+        return data or []
+
+
+class NDJSONRenderer(StreamingRenderer):
+    """Render rows as newline delimited JSON"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def iter_render(self, rows):
+        for row in self.as_rows(rows):
+            yield json.dumps(
+                row, cls=JSONEncoder, ensure_ascii=False
+            ).encode(self.charset) + b'\n'
+
+
+class CSVRenderer(StreamingRenderer):
+    """Render rows as CSV with a header taken from the first row, list
+    values are joined with a pipe"""
+    media_type = 'text/csv'
+    format = 'csv'
+    list_separator = '|'
+
+    def iter_render(self, rows):
+        buffer = StringIO()
+        writer = None
+        for row in self.as_rows(rows):
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow({
+                key: self.list_separator.join(str(item) for item in value)
+                if isinstance(value, (list, tuple)) else value
+                for key, value in row.items()
+            })
+            yield buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+
+
+class JSONStreamRenderer(StreamingRenderer):
+    """Render JSON with lists and iterators encoded an item at a time,
+    so an iterator of rows is never held as a list or a single string.
+
+    The output is the same as the compact output of JSONRenderer, and is
+    yielded in chunks of about chunk_size characters"""
+    media_type = 'application/json'
+    format = 'json'
+    chunk_size = 64 * 1024
+    ensure_ascii = not api_settings.UNICODE_JSON
+    separators = SHORT_SEPARATORS if api_settings.COMPACT_JSON \
+        else LONG_SEPARATORS
+
+    def iter_render(self, data):
+        # JSONRenderer renders None as an empty body
+        if data is None:
+            return
+
+        buffer = []
+        size = 0
+        for part in self.iter_encode(data):
+            buffer.append(part)
+            size += len(part)
+            if size >= self.chunk_size:
+                yield ''.join(buffer).encode(self.charset)
+                buffer = []
+                size = 0
+        if buffer:
+            yield ''.join(buffer).encode(self.charset)
+
+    def iter_encode(self, data):
+        """Yield the JSON encoding of data in parts"""
+        item_separator, key_separator = self.separators
+        if isinstance(data, dict) and any(
+            isinstance(value, Iterator) for value in data.values()
+        ):
+            yield '{'
+            for index, (key, value) in enumerate(data.items()):
+                if index:
+                    yield item_separator
+                yield self.dumps(str(key)) + key_separator
+                yield from self.iter_encode(value)
+            yield '}'
+        elif isinstance(data, (list, tuple, Iterator)):
+            yield '['
+            for index, item in enumerate(data):
+                if index:
+                    yield item_separator
+                yield from self.iter_encode(item)
+            yield ']'
+        else:
+            yield self.dumps(data)
+
+    def dumps(self, value):
+        encoded = json.dumps(
+            value, cls=JSONEncoder, ensure_ascii=self.ensure_ascii,
+            allow_nan=not api_settings.STRICT_JSON,
+            separators=self.separators
+        )
+        # the line separators JSONRenderer escapes for JavaScript
+        return encoded.replace('\u2028', '\\u2028') \
+            .replace('\u2029', '\\u2029')
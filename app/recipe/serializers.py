@@ -1,35 +1,127 @@
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
 from rest_framework import serializers
 from core.models import Tag, Ingredient, Recipe
+from recipe.fields import UserPrimaryKeyRelatedField
 
 
-class TagSerializer(serializers.ModelSerializer):
+def _send_m2m_changed(manager, action, pk_set):
+    """Send the m2m_changed signal the related manager would have sent"""
+    m2m_changed.send(
+        sender=manager.through,
+        action=action,
+        instance=manager.instance,
+        reverse=False,
+        model=manager.model,
+        pk_set=pk_set,
+        using=router.db_for_write(manager.through, instance=manager.instance),
+    )
+
+
+def write_related(instance, field_name, objects, created=False):
+    """Replace the objects related to instance through a many to many
+    field, deleting removed rows and bulk inserting new ones"""
+    manager = getattr(instance, field_name)
+    through = manager.through
+    source = manager.source_field_name + '_id'
+    target = manager.target_field_name + '_id'
+    wanted = {obj.pk for obj in objects}
+
+    existing = set()
+    if not created:
+        existing = set(through.objects.filter(
+            **{source: instance.pk}
+        ).values_list(target, flat=True))
+
+    removed = existing - wanted
+    if removed:
+        _send_m2m_changed(manager, 'pre_remove', removed)
+        through.objects.filter(
+            **{source: instance.pk, target + '__in': removed}
+        ).delete()
+        _send_m2m_changed(manager, 'post_remove', removed)
+
+    added = wanted - existing
+    if added:
+        _send_m2m_changed(manager, 'pre_add', added)
+        through.objects.bulk_create([
+            through(**{source: instance.pk, target: pk}) for pk in added
+        ])
+        _send_m2m_changed(manager, 'post_add', added)
+
+    # drop any stale prefetched rows so the response reflects the write
+    getattr(instance, '_prefetched_objects_cache', {}).pop(field_name, None)
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """Get or create every validated item with a single insert, items
+    whose name the user already has return the existing row"""
+
+    def create(self, validated_data):
+        if not validated_data:
+            return []
+
+        names = [attributes['name'] for attributes in validated_data]
+        objects = {
+            obj.name: obj
+            for obj in self.child.Meta.model.objects.get_or_create_names(
+                validated_data[0]['user'], names
+            )
+        }
+
+        return [objects[name] for name in names]
+
+
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for tags and ingredients, recipe_count is only
+    included when the context asks for it"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('recipe_count'):
+            self.fields.pop('recipe_count', None)
+
+    def create(self, validated_data):
+        """Return the user's tag or ingredient of the name, creating it if
+        they don't have it"""
+        return self.Meta.model.objects.get_or_create_names(
+            validated_data['user'], [validated_data['name']]
+        ).get()
+
+
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tag objects"""
 
     class Meta:
         model = Tag
-        fields = ['id', 'name']
-        read_only_fields = ('id',)
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ('id', 'recipe_count')
+        list_serializer_class = BulkCreateListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredient objects"""
+    # the name of the ingredient's catalog row, see Ingredient.name
+    name = serializers.CharField(max_length=255)
 
     class Meta:
         model = Ingredient
-        fields = ['id', 'name']
-        read_only_fields = ('id',)
+        fields = ['id', 'name', 'recipe_count']
+        read_only_fields = ('id', 'recipe_count')
+        list_serializer_class = BulkCreateListSerializer
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Serialize a recipe"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    related_fields = ('ingredients', 'tags')
 
     class Meta:
         model = Recipe
@@ -38,3 +130,76 @@ class RecipeSerializer(serializers.ModelSerializer):
             'time_minutes', 'price', 'link'
         ]
         read_only_fields = ('id',)
+
+    def __init__(self, *args, **kwargs):
+        """Only serialize the context's fields when it has them"""
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def pop_related(self, validated_data, user):
+        """Remove and return the submitted many to many values, getting or
+        creating the tags and ingredients given by name"""
+        related = {
+            field_name: validated_data.pop(field_name)
+            for field_name in self.related_fields
+            if field_name in validated_data
+        }
+        # the relations with names, whose collections may have changed
+        self.named_fields = []
+        for field_name, values in related.items():
+            names = [value for value in values if isinstance(value, str)]
+            if not names:
+                continue
+            self.named_fields.append(field_name)
+            model = Recipe._meta.get_field(field_name).related_model
+            related[field_name] = [
+                value for value in values if not isinstance(value, str)
+            ] + list(model.objects.get_or_create_names(user, names).only(
+                'id'
+            ))
+
+        return related
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """Create a recipe and bulk insert its tags and ingredients"""
+        related = self.pop_related(validated_data, validated_data['user'])
+        recipe = super().create(validated_data)
+        for field_name, objects in related.items():
+            write_related(recipe, field_name, objects, created=True)
+
+        return recipe
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        """Update a recipe and only write the changed relations"""
+        related = self.pop_related(validated_data, instance.user)
+        recipe = super().update(instance, validated_data)
+        for field_name, objects in related.items():
+            write_related(recipe, field_name, objects)
+
+        return recipe
+
+
+class RecipeImportSerializer(serializers.Serializer):
+    """Validate one line of a recipe import, tags and ingredients are
+    given by name and resolved by the importer"""
+    title = serializers.CharField(max_length=255)
+    time_minutes = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=5, decimal_places=2)
+    link = serializers.CharField(
+        max_length=255,
+        allow_blank=True,
+        default=''
+    )
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        default=list
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        default=list
+    )
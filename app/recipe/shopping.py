@@ -0,0 +1,61 @@
+from django.db import connection
+from core.models import CatalogIngredient, Ingredient, Recipe
+
+
+SHOPPING_LIST_SQL = '''
+WITH selected AS (
+    SELECT id, price, time_minutes
+    FROM {recipe}
+    WHERE user_id = %s AND id = ANY(%s)
+), totals AS (
+    SELECT array_agg(id) AS ids,
+           coalesce(sum(price), 0) AS price,
+           coalesce(sum(time_minutes), 0) AS time_minutes
+    FROM selected
+), items AS (
+    SELECT i.id, c.name, count(*) AS recipe_count
+    FROM selected s
+    JOIN {through} ri ON ri.{recipe_column} = s.id
+    JOIN {ingredient} i ON i.id = ri.{ingredient_column}
+    JOIN {catalog} c ON c.id = i.catalog_id
+    GROUP BY i.id, c.name
+)
+SELECT t.ids, t.price, t.time_minutes, items.id, items.name,
+       items.recipe_count
+FROM totals t
+LEFT JOIN items ON true
+ORDER BY items.name, items.id
+'''
+
+
+def shopping_list(user, recipe_ids):
+    """Return the combined ingredients, with the number of recipes using
+    each, and the total price and time of the user's recipes in
+    recipe_ids, in one statement"""
+    field = Recipe._meta.get_field('ingredients')
+    sql = SHOPPING_LIST_SQL.format(
+        recipe=Recipe._meta.db_table,
+        ingredient=Ingredient._meta.db_table,
+        catalog=CatalogIngredient._meta.db_table,
+        through=field.m2m_db_table(),
+        recipe_column=field.m2m_column_name(),
+        ingredient_column=field.m2m_reverse_name(),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user.pk, list(recipe_ids)])
+        rows = cursor.fetchall()
+
+    found, price, time_minutes = rows[0][:3]
+    found = set(found or ())
+
+    return {
+        'recipes': sorted(found),
+        'not_found': [pk for pk in recipe_ids if pk not in found],
+        'total_price': price,
+        'total_time_minutes': time_minutes,
+        'ingredients': [
+            {'id': pk, 'name': name, 'recipe_count': recipe_count}
+            for _ids, _price, _time, pk, name, recipe_count in rows
+            if pk is not None
+        ],
+    }
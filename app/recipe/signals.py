@@ -0,0 +1,229 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+from core.models import CollectionVersion, Ingredient, Recipe, Tag
+from core.signals import collection_bumped
+from recipe.cache import response_cache
+from recipe.pantry import pantry_indexes
+from recipe.similarity import feature, links, similarity_indexes
+
+
+# sent by RecipeImporter after each batch, which is bulk inserted without
+# the model signals
+recipes_imported = Signal(providing_args=['user', 'recipe_ids'])
+
+
+RESOURCES = {
+    Tag: CollectionVersion.TAGS,
+    Ingredient: CollectionVersion.INGREDIENTS,
+}
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_collection(sender, instance, **kwargs):
+    """Drop cached lists of the collection a tag or ingredient is in"""
+    response_cache.invalidate(instance.user_id, RESOURCES[sender])
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_relations(sender, instance, **kwargs):
+    """Drop cached tag and ingredient lists when a recipe, and with it
+    its links to them, is deleted"""
+    response_cache.invalidate(instance.user_id, *RESOURCES.values())
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_related_collection(sender, instance, action, model,
+                                  **kwargs):
+    """Drop cached lists of the collection on either side of a changed
+    recipe relation"""
+    if not action.startswith('post_'):
+        return
+
+    # instance is the recipe, or the tag or ingredient for reverse changes
+    related = model if isinstance(instance, Recipe) else type(instance)
+    response_cache.invalidate(instance.user_id, RESOURCES[related])
+
+
+def change_index(indexes, user_id, change):
+    """Call change with the user's loaded index of indexes once the
+    current transaction commits, so a rolled back write, which bumps no
+    version, isn't left in the index"""
+    def apply():
+        index = indexes.loaded(user_id)
+        if index is not None:
+            change(index)
+
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, created, **kwargs):
+    """Add a new recipe to its user's pantry index"""
+    if created:
+        recipe_id = instance.pk
+        change_index(
+            pantry_indexes, instance.user_id,
+            lambda index: index.set_recipe(recipe_id)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    """Remove a deleted recipe from its user's pantry index"""
+    recipe_id = instance.pk
+    change_index(
+        pantry_indexes, instance.user_id,
+        lambda index: index.discard_recipe(recipe_id)
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def unindex_ingredient(sender, instance, **kwargs):
+    """Unlink a deleted ingredient in its user's pantry index"""
+    ingredient_id = instance.pk
+    change_index(
+        pantry_indexes, instance.user_id,
+        lambda index: index.discard_ingredient(ingredient_id)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_recipe_ingredients(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Apply a changed recipe ingredient link to the pantry index"""
+    if not action.startswith('post_'):
+        return
+
+    # clearing passes None, which removes from every recipe when reverse
+    pk_set = set(pk_set) if pk_set is not None else None
+    if reverse:
+        # instance is the ingredient and pk_set the recipes
+        ingredient_ids = [instance.pk]
+        if action == 'post_add':
+            def change(index):
+                index.add_ingredients(pk_set, ingredient_ids)
+        else:
+            def change(index):
+                index.remove_ingredients(pk_set, ingredient_ids)
+    else:
+        recipe_id = instance.pk
+        if action == 'post_add':
+            def change(index):
+                index.add_ingredients([recipe_id], pk_set)
+        elif action == 'post_remove':
+            def change(index):
+                index.remove_ingredients([recipe_id], pk_set)
+        else:
+            def change(index):
+                index.set_recipe(recipe_id)
+
+    change_index(pantry_indexes, instance.user_id, change)
+
+
+@receiver(recipes_imported)
+def index_imported_recipes(sender, user, recipe_ids, **kwargs):
+    """Add a batch of imported recipes to the pantry index"""
+    index = pantry_indexes.loaded(user.pk)
+    if index is None:
+        return
+
+    ingredients = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, ingredient_id in Recipe.ingredients.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id'):
+        ingredients[recipe_id].append(ingredient_id)
+    for recipe_id, ingredient_ids in ingredients.items():
+        index.set_recipe(recipe_id, ingredient_ids)
+
+
+@receiver(collection_bumped)
+def advance_indexes(sender, user, versions, **kwargs):
+    """Mark loaded indexes current after this process' writes"""
+    pantry_indexes.bumped(user.pk, versions)
+    similarity_indexes.bumped(user.pk, versions)
+
+
+@receiver(post_save, sender=Recipe)
+def add_recipe_vector(sender, instance, created, **kwargs):
+    """Add a new recipe to its user's similarity index"""
+    if created:
+        recipe_id = instance.pk
+        change_index(
+            similarity_indexes, instance.user_id,
+            lambda index: index.set_vector(recipe_id)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_vector(sender, instance, **kwargs):
+    """Remove a deleted recipe from its user's similarity index"""
+    recipe_id = instance.pk
+    change_index(
+        similarity_indexes, instance.user_id,
+        lambda index: index.discard_recipe(recipe_id)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def remove_feature(sender, instance, **kwargs):
+    """Remove a deleted tag or ingredient from every recipe vector"""
+    field_name = 'tags' if sender is Tag else 'ingredients'
+    features = [feature(field_name, instance.pk)]
+    change_index(
+        similarity_indexes, instance.user_id,
+        lambda index: index.remove_features(None, features)
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_recipe_vectors(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Apply a changed recipe tag or ingredient link to the similarity
+    index"""
+    if not action.startswith('post_'):
+        return
+
+    field_name = 'tags' if sender is Recipe.tags.through else 'ingredients'
+    if reverse:
+        # instance is the tag or ingredient and pk_set the recipes
+        recipe_ids, features = pk_set, [feature(field_name, instance.pk)]
+    else:
+        recipe_ids = [instance.pk]
+        features = [feature(field_name, pk) for pk in pk_set or ()]
+    recipe_ids = set(recipe_ids) if recipe_ids is not None else None
+    recipe_id = instance.pk
+
+    def change(index):
+        if action == 'post_add':
+            index.add_features(recipe_ids, features)
+        elif action == 'post_remove' or reverse:
+            index.remove_features(recipe_ids, features)
+        else:
+            # cleared every tag or ingredient of the recipe
+            index.remove_features(recipe_ids, [
+                number for number in index.vectors.get(recipe_id, ())
+                if number % 2 == (field_name == 'tags')
+            ])
+
+    change_index(similarity_indexes, instance.user_id, change)
+
+
+@receiver(recipes_imported)
+def add_imported_vectors(sender, user, recipe_ids, **kwargs):
+    """Add a batch of imported recipes to the similarity index"""
+    index = similarity_indexes.loaded(user.pk)
+    if index is None:
+        return
+
+    features = {recipe_id: [] for recipe_id in recipe_ids}
+    for field_name, recipe_id, related_id in links(recipe_id__in=recipe_ids):
+        features[recipe_id].append(feature(field_name, related_id))
+    for recipe_id, recipe_features in features.items():
+        index.set_vector(recipe_id, recipe_features)
@@ -0,0 +1,157 @@
+import heapq
+import math
+from array import array
+from collections import defaultdict
+from django.conf import settings
+from core.models import CollectionVersion, Recipe
+from recipe.indexes import UserIndex, UserIndexes
+
+
+JACCARD = 'jaccard'
+COSINE = 'cosine'
+METRICS = (JACCARD, COSINE)
+
+
+def feature(field_name, related_id):
+    """Return the feature number of a tag or ingredient id"""
+    return related_id * 2 + (field_name == 'tags')
+
+
+class SimilarityIndex(UserIndex):
+    """A user's recipes as sparse binary vectors over their ingredients
+    and tags.
+
+    Each recipe's vector is a sorted array of feature numbers and each
+    feature has a posting set of the recipes using it. The recipes similar
+    to one are found by counting the overlap through the postings of its
+    own features, so only recipes sharing at least one feature are
+    scored"""
+    resources = (
+        CollectionVersion.RECIPES,
+        CollectionVersion.TAGS,
+        CollectionVersion.INGREDIENTS,
+    )
+    field_names = ('ingredients', 'tags')
+
+    def __init__(self, versions):
+        super().__init__(versions)
+        self.vectors = {}
+        self.postings = defaultdict(set)
+
+    @classmethod
+    def build(cls, user):
+        """Load the index for user with a query per relation"""
+        index = cls(CollectionVersion.objects.get_versions(
+            user, cls.resources
+        ))
+        features = {
+            recipe_id: []
+            for recipe_id in Recipe.objects.filter(
+                user=user
+            ).values_list('id', flat=True).iterator()
+        }
+        for field_name, recipe_id, related_id in links(
+            recipe__user=user
+        ):
+            features[recipe_id].append(feature(field_name, related_id))
+
+        for recipe_id, recipe_features in features.items():
+            index.set_vector(recipe_id, recipe_features)
+
+        return index
+
+    def set_vector(self, recipe_id, features=()):
+        """Replace the features of a recipe"""
+        with self.lock:
+            self.discard_recipe(recipe_id)
+            vector = array('q', sorted(set(features)))
+            self.vectors[recipe_id] = vector
+            for number in vector:
+                self.postings[number].add(recipe_id)
+
+    def discard_recipe(self, recipe_id):
+        with self.lock:
+            for number in self.vectors.pop(recipe_id, ()):
+                self.postings[number].discard(recipe_id)
+
+    def add_features(self, recipe_ids, features):
+        with self.lock:
+            for recipe_id in recipe_ids:
+                self.set_vector(
+                    recipe_id,
+                    list(self.vectors.get(recipe_id, ())) + list(features)
+                )
+
+    def remove_features(self, recipe_ids, features):
+        """Remove features from the recipes, recipe_ids None for all of
+        the recipes that have them"""
+        features = set(features)
+        with self.lock:
+            if recipe_ids is None:
+                recipe_ids = set().union(*(
+                    self.postings.get(number, ()) for number in features
+                ))
+            for recipe_id in list(recipe_ids):
+                if recipe_id in self.vectors:
+                    self.set_vector(recipe_id, [
+                        number for number in self.vectors[recipe_id]
+                        if number not in features
+                    ])
+            for number in features:
+                if not self.postings.get(number, True):
+                    del self.postings[number]
+
+    def similar(self, recipe_id, limit, metric=JACCARD):
+        """Return (score, recipe id) for the limit recipes most similar to
+        recipe_id, best first"""
+        with self.lock:
+            vector = self.vectors.get(recipe_id)
+            if not vector:
+                return []
+
+            overlaps = defaultdict(int)
+            for number in vector:
+                for other in self.postings[number]:
+                    overlaps[other] += 1
+            overlaps.pop(recipe_id, None)
+
+            size = len(vector)
+            if metric == COSINE:
+                scores = (
+                    (overlap / math.sqrt(size * len(self.vectors[other])),
+                     other)
+                    for other, overlap in overlaps.items()
+                )
+            else:
+                scores = (
+                    (overlap / (size + len(self.vectors[other]) - overlap),
+                     other)
+                    for other, overlap in overlaps.items()
+                )
+
+            return heapq.nlargest(limit, scores)
+
+
+def links(**filters):
+    """Yield (field name, recipe id, related id) for the recipe tag and
+    ingredient links matching filters"""
+    for field_name in SimilarityIndex.field_names:
+        field = Recipe._meta.get_field(field_name)
+        through = field.remote_field.through
+        yield from (
+            (field_name, recipe_id, related_id)
+            for recipe_id, related_id in through.objects.filter(
+                **filters
+            ).values_list(
+                'recipe_id', field.m2m_reverse_field_name() + '_id'
+            ).iterator()
+        )
+
+
+similarity_indexes = UserIndexes(
+    SimilarityIndex,
+    settings.SIMILARITY_INDEX['MAX_USERS'],
+    settings.SIMILARITY_INDEX['TTL'],
+    shared_alias=settings.SIMILARITY_INDEX['SHARED_ALIAS'],
+    shared_ttl=settings.SIMILARITY_INDEX['SHARED_TTL'],
+)
@@ -0,0 +1,74 @@
+import math
+from django.conf import settings
+from core.models import Ingredient, RecipeStats, RecipeValueCount, Tag
+
+
+def percentiles(values, total, ranks):
+    """Return the nearest rank percentile of ranks from (value, count)
+    pairs in ascending order of value"""
+    results = {}
+    pending = sorted(ranks)
+    seen = 0
+    for value, count in values:
+        seen += count
+        while pending and seen >= math.ceil(pending[0] / 100 * total):
+            results[pending.pop(0)] = value
+        if not pending:
+            break
+
+    return results
+
+
+def recipe_stats(user):
+    """Return the recipe statistics of user from the summary tables"""
+    config = settings.RECIPE_STATS
+    stats = RecipeStats.objects.filter(user=user).first() or RecipeStats()
+
+    values = {field: [] for field, _label in RecipeValueCount.FIELD_CHOICES}
+    for field, value, count in RecipeValueCount.objects.filter(
+        user=user, count__gt=0
+    ).order_by('field', 'value').values_list('field', 'value', 'count'):
+        values[field].append((value, count))
+
+    total = stats.recipe_count
+    price = percentiles(
+        values[RecipeValueCount.PRICE], total, config['PERCENTILES']
+    )
+    time_minutes = percentiles(
+        values[RecipeValueCount.TIME_MINUTES], total, config['PERCENTILES']
+    )
+
+    return {
+        'recipe_count': total,
+        'tag_count': stats.tag_count,
+        'ingredient_count': stats.ingredient_count,
+        'price': {
+            'average': (
+                '{:.2f}'.format(stats.price_sum / total) if total else None
+            ),
+            **{
+                'p{}'.format(rank): '{:.2f}'.format(value)
+                for rank, value in price.items()
+            },
+        },
+        'time_minutes': {
+            'average': (
+                round(stats.time_minutes_sum / total, 2) if total else None
+            ),
+            **{
+                'p{}'.format(rank): int(value)
+                for rank, value in time_minutes.items()
+            },
+        },
+        'top_tags': top_used(Tag, user, config['TOP']),
+        'top_ingredients': top_used(Ingredient, user, config['TOP']),
+    }
+
+
+def top_used(model, user, limit):
+    """Return the limit tags or ingredients used by the most recipes"""
+    return list(model.objects.filter(
+        user=user, recipe_count__gt=0
+    ).order_by('-recipe_count', 'id').values(
+        'id', 'name', 'recipe_count'
+    )[:limit])
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase
+from rest_framework.test import APIClient
+from core.models import Recipe
+
+
+def sample_user(email='test@testmail.com', password='password123'):
+    """Create and return a sample user"""
+    return get_user_model().objects.create_user(email, password)
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PrivateApiTestCase(TestCase):
+    """Test case with a sample user and an api client authenticated as
+    them"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(self.user)
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """Run the on_commit callbacks registered inside the block when it
+    exits, as TestCase never commits"""
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        callbacks = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _savepoint_ids, callback in callbacks:
+            callback()
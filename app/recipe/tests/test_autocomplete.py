@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import CollectionVersion, Ingredient, Tag
+from recipe.autocomplete import IngredientNameIndex, name_indexes
+
+
+TAG_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENT_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class NameIndexTests(TestCase):
+    """Test prefix and substring lookups of the name index"""
+
+    def setUp(self):
+        self.index = IngredientNameIndex({}, [
+            (1, 'Tomato'), (2, 'tomatillo'), (3, 'Cherry tomato'),
+            (4, 'Potato'), (5, 'Toast'), (6, 'Tomato'),
+        ])
+
+    def test_prefix(self):
+        """Test prefixes ignore case and are in name then id order"""
+        self.assertEqual(self.index.prefix('TOMA', 10), [2, 1, 6])
+        self.assertEqual(self.index.prefix('to', 2), [5, 2])
+        self.assertEqual(self.index.prefix('x', 10), [])
+
+    def test_search(self):
+        """Test names starting with the query rank first, then those with
+        a word starting with it, each in name order"""
+        self.assertEqual(self.index.search('tomat', 10), [2, 1, 6, 3])
+        self.assertEqual(self.index.search('ato', 10), [3, 4, 1, 6])
+        self.assertEqual(self.index.search('ato', 2), [3, 4])
+        self.assertEqual(self.index.search('tomato', 3), [1, 6, 3])
+        self.assertEqual(self.index.search('o\nt', 10), [])
+
+    def test_empty(self):
+        """Test an index without names"""
+        index = IngredientNameIndex({})
+
+        self.assertEqual(index.prefix('a', 10), [])
+        self.assertEqual(index.search('a', 10), [])
+
+
+class AutocompleteApiTests(TestCase):
+    """Test autocompleting tag and ingredient names"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        for name in ('Tomato', 'tomatillo', 'Cherry tomato', 'Potato'):
+            Ingredient.objects.create(user=self.user, name=name)
+        other = get_user_model().objects.create_user(
+            'other@testmail.com',
+            'password123'
+        )
+        Ingredient.objects.create(user=other, name='Tomato paste')
+        Tag.objects.create(user=self.user, name='Quick')
+        for indexes in name_indexes.values():
+            indexes.clear()
+
+    def names(self, url=INGREDIENT_AUTOCOMPLETE_URL, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [item['name'] for item in response.data['results']]
+
+    def test_prefix(self):
+        """Test the user's names starting with the prefix are returned"""
+        self.assertEqual(self.names(prefix='tom'), ['tomatillo', 'Tomato'])
+
+    def test_query(self):
+        """Test the user's names containing q are returned"""
+        self.assertEqual(
+            self.names(q='mat', limit=2), ['Cherry tomato', 'tomatillo']
+        )
+
+    def test_tags(self):
+        """Test tags are autocompleted"""
+        self.assertEqual(self.names(TAG_AUTOCOMPLETE_URL, q='qui'), ['Quick'])
+
+    def test_rebuilt_after_write(self):
+        """Test the index is rebuilt after names are bulk created"""
+        self.assertEqual(self.names(prefix='pot'), ['Potato'])
+
+        self.client.post(
+            INGREDIENTS_URL, [{'name': 'Pot barley'}], format='json'
+        )
+
+        self.assertEqual(self.names(prefix='pot'), ['Pot barley', 'Potato'])
+
+    def test_index_reused(self):
+        """Test a current index is used without querying the names"""
+        self.names(prefix='t')
+
+        with self.assertNumQueries(3):
+            # the etag versions, the index versions and the page
+            self.names(prefix='t')
+
+    def test_requires_query(self):
+        """Test a prefix or q is required and limit is validated"""
+        missing = self.client.get(INGREDIENT_AUTOCOMPLETE_URL)
+        bad_limit = self.client.get(
+            INGREDIENT_AUTOCOMPLETE_URL, {'prefix': 't', 'limit': 0}
+        )
+
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(bad_limit.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_etag(self):
+        """Test results are revalidated with the collection version"""
+        first = self.client.get(INGREDIENT_AUTOCOMPLETE_URL, {'q': 'tomato'})
+        cached = self.client.get(
+            INGREDIENT_AUTOCOMPLETE_URL, {'q': 'tomato'},
+            HTTP_IF_NONE_MATCH=first['ETag']
+        )
+        CollectionVersion.objects.bump(
+            self.user, CollectionVersion.INGREDIENTS
+        )
+        changed = self.client.get(
+            INGREDIENT_AUTOCOMPLETE_URL, {'q': 'tomato'},
+            HTTP_IF_NONE_MATCH=first['ETag']
+        )
+
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
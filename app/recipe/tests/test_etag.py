@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, CollectionVersion
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class CollectionVersionTests(TestCase):
+    """Test per user collection versions"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+
+    def test_unwritten_collection_is_version_zero(self):
+        """Test collections without writes start at version 0"""
+        versions = CollectionVersion.objects.get_versions(
+            self.user, ['recipes', 'tags']
+        )
+
+        self.assertEqual(versions, {'recipes': 0, 'tags': 0})
+
+    def test_bump(self):
+        """Test bumping increments only the given collections"""
+        CollectionVersion.objects.bump(self.user, 'recipes')
+        bumped = CollectionVersion.objects.bump(self.user, 'recipes', 'tags')
+
+        self.assertEqual(bumped, {'recipes': 2, 'tags': 1})
+        self.assertEqual(
+            CollectionVersion.objects.get_versions(
+                self.user, ['recipes', 'tags', 'ingredients']
+            ),
+            {'recipes': 2, 'tags': 1, 'ingredients': 0}
+        )
+
+
+class ConditionalReadTests(TestCase):
+    """Test ETag and If-None-Match handling on the recipe api"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_list_not_modified(self):
+        """Test an unchanged list returns 304 with a single query"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_changes_etag(self):
+        """Test creating a tag through the api invalidates the ETag"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_etag_depends_on_query(self):
+        """Test different pages of a list have different ETags"""
+        first = self.client.get(RECIPES_URL)
+        second = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_recipe_update_changes_detail_etag(self):
+        """Test updating a recipe invalidates its detail ETag"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5, price=1.00
+        )
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+        self.assertEqual(
+            self.client.get(
+                detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Stew'})
+        response = self.client.get(
+            detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Stew')
+
+    def test_etag_per_user(self):
+        """Test another user's ETag doesn't match"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        user2 = get_user_model().objects.create_user(
+            'another@testmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(user2)
+
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,143 @@
+import csv
+import json
+from decimal import Decimal
+from io import StringIO
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from core.models import Tag, Ingredient
+from recipe.renderers import JSONStreamRenderer
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe, sample_user
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportApiTests(PrivateApiTestCase):
+    """Test streaming a user's recipes"""
+
+    def export(self, export_format):
+        response = self.client.get(EXPORT_URL, {'format': export_format})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as newline delimited JSON"""
+        recipe = sample_recipe(user=self.user, title='Curry')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Spicy'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice'),
+            Ingredient.objects.create(user=self.user, name='Chilli'),
+        )
+        sample_recipe(user=sample_user('another@testmail.com'))
+
+        lines = self.export('ndjson').splitlines()
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0]), {
+            'id': recipe.id,
+            'title': 'Curry',
+            'tags': ['Spicy'],
+            'ingredients': ['Chilli', 'Rice'],
+            'time_minutes': 10,
+            'price': '5.00',
+            'link': '',
+        })
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        recipe = sample_recipe(user=self.user, title='Curry, mild')
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Rice'),
+            Ingredient.objects.create(user=self.user, name='Peas'),
+        )
+
+        rows = list(csv.DictReader(StringIO(self.export('csv'))))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry, mild')
+        self.assertEqual(rows[0]['ingredients'], 'Peas|Rice')
+        self.assertEqual(rows[0]['tags'], '')
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_queries_per_chunk(self):
+        """Test related names are fetched per chunk rather than per row"""
+        for index in range(5):
+            recipe = sample_recipe(user=self.user, title=str(index))
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=str(index))
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            lines = self.export('ndjson').splitlines()
+
+        self.assertEqual(len(lines), 5)
+        # the recipe cursor plus one query per relation for 3 chunks
+        self.assertEqual(len(queries), 1 + 2 * 3)
+
+    def test_export_json(self):
+        """Test exporting recipes as a JSON array"""
+        sample_recipe(user=self.user, title='Curry')
+        sample_recipe(user=self.user, title='Soup')
+
+        rows = json.loads(self.export('json'))
+
+        self.assertEqual([row['title'] for row in rows], ['Curry', 'Soup'])
+
+
+class JSONStreamRendererTests(TestCase):
+    """Test the streaming JSON renderer matches JSONRenderer"""
+
+    def assertRendersLike(self, data, streamed=None):
+        expected = JSONRenderer().render(data)
+        renderer = JSONStreamRenderer()
+        renderer.chunk_size = 8
+
+        self.assertEqual(
+            b''.join(renderer.iter_render(
+                data if streamed is None else streamed
+            )),
+            expected
+        )
+
+    def test_render_values(self):
+        """Test lists, dicts, decimals and escaped characters"""
+        self.assertRendersLike({
+            'results': [
+                {'id': 1, 'title': 'Crème brûlée\u2028', 'tags': [1, 2]},
+                {'id': 2, 'title': '"quoted"', 'price': Decimal('5.50')},
+            ],
+            'next': None,
+        })
+        self.assertRendersLike([])
+        self.assertRendersLike(None)
+
+    def test_render_iterator(self):
+        """Test iterators are rendered as arrays, also inside a dict"""
+        rows = [{'id': index} for index in range(50)]
+
+        self.assertRendersLike(rows, iter(rows))
+        self.assertRendersLike(
+            {'next': None, 'results': rows},
+            {'next': None, 'results': (row for row in rows)}
+        )
+
+    def test_render_chunks(self):
+        """Test rows are yielded in chunks rather than at the end"""
+        renderer = JSONStreamRenderer()
+        renderer.chunk_size = 100
+        consumed = []
+
+        def rows():
+            for index in range(100):
+                consumed.append(index)
+                yield {'id': index}
+
+        chunks = renderer.iter_render(rows())
+        next(chunks)
+
+        self.assertLess(len(consumed), 20)
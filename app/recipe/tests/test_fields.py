@@ -0,0 +1,98 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from core.models import Tag
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeFieldsApiTests(PrivateApiTestCase):
+    """Test selecting the serialized recipe fields with ?fields="""
+
+    def setUp(self):
+        super().setUp()
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.salad = sample_recipe(self.user, title='Salad', link='x.com')
+        self.salad.tags.add(self.vegan)
+        self.curry = sample_recipe(self.user, title='Curry', price=7.50)
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response, [query['sql'] for query in queries]
+
+    def test_list_fields(self):
+        """Test only the requested fields are returned and selected"""
+        response, queries = self.get(RECIPES_URL, fields='id,price')
+
+        self.assertEqual(response.data['results'], [
+            {'id': self.salad.id, 'price': '5.00'},
+            {'id': self.curry.id, 'price': '7.50'},
+        ])
+        page = queries[-1]
+        self.assertIn('"core_recipe"."price"', page)
+        # the ordering column is still loaded for the next page cursor
+        self.assertIn('"core_recipe"."title"', page)
+        self.assertNotIn('"core_recipe"."link"', page)
+        self.assertNotIn('"core_recipe"."search_vector"', page)
+
+    def test_fields_skip_prefetch(self):
+        """Test the related ids are only fetched when requested"""
+        _response, plain = self.get(RECIPES_URL, fields='id,title')
+        response, tagged = self.get(RECIPES_URL, fields='id,tags')
+
+        self.assertEqual(len(tagged), len(plain) + 1)
+        self.assertFalse(any('core_recipe_tags' in sql for sql in plain))
+        self.assertEqual(response.data['results'][0]['tags'], [self.vegan.id])
+
+    def test_fields_paginate(self):
+        """Test the cursor of a pruned page still pages on"""
+        response, _queries = self.get(
+            RECIPES_URL, fields='id', page_size=1
+        )
+        next_page = self.client.get(response.data['next'])
+
+        self.assertEqual(next_page.data['results'], [{'id': self.curry.id}])
+
+    def test_fields_search(self):
+        """Test fields combine with search ranking"""
+        response, _queries = self.get(
+            RECIPES_URL, fields='title', search='curry'
+        )
+
+        self.assertEqual(response.data['results'], [{'title': 'Curry'}])
+
+    def test_retrieve_fields(self):
+        """Test fields apply to a single recipe"""
+        response, _queries = self.get(
+            detail_url(self.salad.id), fields='link'
+        )
+
+        self.assertEqual(response.data, {'link': 'x.com'})
+
+    def test_unknown_field(self):
+        """Test an unknown field is rejected"""
+        response = self.client.get(RECIPES_URL, {'fields': 'id,owner'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('owner', str(response.data['fields']))
+
+    def test_write_returns_all_fields(self):
+        """Test fields don't trim the response to a write"""
+        response = self.client.patch(
+            detail_url(self.curry.id) + '?fields=id', {'title': 'Dal'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Dal')
+        self.assertIn('price', response.data)
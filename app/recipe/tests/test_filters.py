@@ -0,0 +1,79 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from core.models import Tag, Ingredient
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeFilterApiTests(PrivateApiTestCase):
+    """Test filtering recipes by tags and ingredients"""
+
+    def setUp(self):
+        super().setUp()
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.salad = sample_recipe(self.user, title='Salad')
+        self.salad.tags.add(self.vegan, self.quick)
+        self.curry = sample_recipe(self.user, title='Curry')
+        self.curry.tags.add(self.vegan)
+        self.curry.ingredients.add(self.rice)
+        self.steak = sample_recipe(self.user, title='Steak')
+
+    def filter(self, **params):
+        response = self.client.get(RECIPES_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_filter_tags_any(self):
+        """Test recipes with any of the tags are returned once each"""
+        ids = self.filter(tags='{},{}'.format(self.vegan.id, self.quick.id))
+
+        self.assertEqual(ids, {self.salad.id, self.curry.id})
+
+    def test_filter_tags_all(self):
+        """Test match=all only returns recipes with every tag"""
+        ids = self.filter(
+            tags='{},{}'.format(self.vegan.id, self.quick.id), match='all'
+        )
+
+        self.assertEqual(ids, {self.salad.id})
+
+    def test_filter_tags_and_ingredients(self):
+        """Test tag and ingredient filters are combined"""
+        ids = self.filter(tags=self.vegan.id, ingredients=self.rice.id)
+
+        self.assertEqual(ids, {self.curry.id})
+
+    def test_filter_repeated_id(self):
+        """Test a repeated id still matches with match=all"""
+        ids = self.filter(
+            tags='{0},{0}'.format(self.quick.id), match='all'
+        )
+
+        self.assertEqual(ids, {self.salad.id})
+
+    def test_filter_uses_subqueries(self):
+        """Test filtering doesn't join the through tables into the list"""
+        with CaptureQueriesContext(connection) as queries:
+            self.filter(tags=self.vegan.id, ingredients=self.rice.id)
+
+        listing = next(
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT "core_recipe"."id"')
+        )
+        self.assertIn('EXISTS', listing)
+        self.assertNotIn('DISTINCT', listing)
+
+    def test_invalid_filters(self):
+        """Test malformed ids and match values are rejected"""
+        bad_ids = self.client.get(RECIPES_URL, {'tags': '1,x'})
+        bad_match = self.client.get(RECIPES_URL, {'match': 'some'})
+
+        self.assertEqual(bad_ids.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(bad_match.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,158 @@
+import json
+import tempfile
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Recipe, Tag, Ingredient
+
+
+IMPORT_URL = reverse('recipe:recipe-import-recipes')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def ndjson(*items):
+    """Return items encoded as newline delimited JSON"""
+    return '\n'.join(
+        item if isinstance(item, str) else json.dumps(item)
+        for item in items
+    ) + '\n'
+
+
+class RecipeImportApiTests(TestCase):
+    """Test importing recipes from newline delimited JSON"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def post(self, body):
+        return self.client.post(
+            IMPORT_URL, body, content_type='application/x-ndjson'
+        )
+
+    def test_import_recipes(self):
+        """Test recipes are created with their tags and ingredients"""
+        existing = Tag.objects.create(user=self.user, name='Dessert')
+        body = ndjson(
+            {'title': 'Cheesecake', 'time_minutes': 60, 'price': '12.50',
+             'tags': ['Dessert'], 'ingredients': ['Cheese', 'Sugar']},
+            {'title': 'Fudge', 'time_minutes': 30, 'price': '4.00',
+             'tags': ['Dessert', 'Sweet'], 'ingredients': ['Sugar']},
+        )
+
+        response = self.post(body)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['error_count'], 0)
+        self.assertIn('rows_per_second', response.data)
+        cheesecake = Recipe.objects.get(user=self.user, title='Cheesecake')
+        self.assertEqual(list(cheesecake.tags.all()), [existing])
+        self.assertEqual(
+            sorted(cheesecake.ingredients.values_list('name', flat=True)),
+            ['Cheese', 'Sugar']
+        )
+        self.assertEqual(Ingredient.objects.filter(name='Sugar').count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_reports_line_errors(self):
+        """Test invalid lines are reported and valid ones still imported"""
+        body = ndjson(
+            {'title': 'Soup', 'time_minutes': 20, 'price': '3.00'},
+            '{not json',
+            {'title': 'Stew', 'price': '3.00'},
+        )
+
+        response = self.post(body)
+
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['error_count'], 2)
+        self.assertEqual(
+            [error['line'] for error in response.data['errors']],
+            [2, 3]
+        )
+        self.assertIn('time_minutes', response.data['errors'][1]['errors'])
+
+    def test_import_in_batches(self):
+        """Test the import spans several transactional batches"""
+        with self.settings(RECIPE_IMPORT_BATCH_SIZE=2):
+            response = self.post(ndjson(*[
+                {'title': str(index), 'time_minutes': 5, 'price': '1.00',
+                 'tags': ['Quick']}
+                for index in range(5)
+            ]))
+
+        self.assertEqual(response.data['created'], 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(Recipe.tags.through.objects.count(), 5)
+
+    def test_import_requires_authentication(self):
+        """Test anonymous users can't import recipes"""
+        self.client.force_authenticate(None)
+
+        response = self.post(ndjson({'title': 'Soup'}))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ImportRecipesCommandTests(TestCase):
+    """Test the import_recipes management command"""
+
+    def test_import_from_file(self):
+        """Test importing a file for a user"""
+        user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as lines:
+            lines.write(ndjson(
+                {'title': 'Toast', 'time_minutes': 3, 'price': '1.00',
+                 'ingredients': ['Bread']},
+            ))
+            lines.flush()
+            out = StringIO()
+            call_command(
+                'import_recipes', lines.name, email=user.email, stdout=out
+            )
+
+        self.assertIn('Imported 1 recipes', out.getvalue())
+        recipe = Recipe.objects.get(user=user)
+        self.assertEqual(recipe.ingredients.get().name, 'Bread')
+
+    def test_import_changes_etag(self):
+        """Test importing from the command invalidates the user's cached
+        lists, like importing through the api"""
+        user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        etag = client.get(TAGS_URL)['ETag']
+
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as lines:
+            lines.write(ndjson(
+                {'title': 'Toast', 'time_minutes': 3, 'price': '1.00',
+                 'tags': ['Breakfast']},
+            ))
+            lines.flush()
+            call_command(
+                'import_recipes', lines.name, email=user.email,
+                stdout=StringIO()
+            )
+        response = client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            [tag['name'] for tag in response.json()['results']],
+            ['Breakfast']
+        )
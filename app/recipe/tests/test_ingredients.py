@@ -41,10 +41,10 @@ class PrivateIngredientsApiTests(TestCase):
 
         response = self.client.get(INGREDIENTS_URL)
 
-        ingredients = Ingredient.objects.all().order_by('-name')
+        ingredients = Ingredient.objects.all().order_by('-name', '-id')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_ingredients_to_user(self):
         """Test that only ingredients for the
@@ -59,8 +59,8 @@ class PrivateIngredientsApiTests(TestCase):
         response = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], ingredient.name)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """Test create a new ingredient"""
@@ -80,3 +80,16 @@ class PrivateIngredientsApiTests(TestCase):
         response = self.client.post(INGREDIENTS_URL, payload)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_ingredients(self):
+        """Test creating a list of ingredients in one request"""
+        payload = [{'name': 'Flour'}, {'name': 'Sugar'}]
+
+        response = self.client.post(INGREDIENTS_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ingredients = Ingredient.objects.filter(user=self.user)
+        self.assertEqual(
+            [ingredient['id'] for ingredient in response.data],
+            list(ingredients.order_by('id').values_list('id', flat=True))
+        )
@@ -0,0 +1,116 @@
+import json
+from base64 import urlsafe_b64encode
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from core.models import Recipe, Tag
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class KeysetPaginationTests(PrivateApiTestCase):
+    """Test cursor pagination of the recipe api list endpoints"""
+
+    def collect_ids(self, url):
+        """Follow next links from url and return every id seen"""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+
+        return ids
+
+    def test_pages_follow_title_then_id_ordering(self):
+        """Test walking every page returns each recipe once in order"""
+        for title in ['b', 'a', 'b', 'c', 'a', 'b', 'c']:
+            sample_recipe(user=self.user, title=title)
+
+        ids = self.collect_ids(RECIPES_URL + '?page_size=2')
+
+        expected = Recipe.objects.order_by('-title', '-id')
+        self.assertEqual(ids, [recipe.id for recipe in expected])
+
+    def test_previous_link_returns_previous_page(self):
+        """Test the previous cursor returns the page before"""
+        for title in ['a', 'b', 'c', 'd', 'e']:
+            Tag.objects.create(user=self.user, name=title)
+
+        first = self.client.get(TAGS_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(previous.data['results'], first.data['results'])
+        self.assertEqual(
+            [tag['name'] for tag in second.data['results']],
+            ['c', 'b']
+        )
+
+    def test_last_page_has_no_next_link(self):
+        """Test the final page does not link to an empty page"""
+        sample_recipe(user=self.user)
+        sample_recipe(user=self.user)
+
+        response = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    @override_settings(MAX_PAGE_SIZE=3)
+    def test_page_size_capped(self):
+        """Test the page size query parameter cannot exceed the maximum"""
+        for _ in range(5):
+            sample_recipe(user=self.user)
+
+        response = self.client.get(RECIPES_URL, {'page_size': 50})
+
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns not found"""
+        response = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_wrong_typed_cursor(self):
+        """Test a cursor with values of the wrong type for the ordering
+        returns not found"""
+        sample_recipe(self.user, title='Soup')
+        cases = [
+            (RECIPES_URL, {}, ['x', 'y']),
+            (RECIPES_URL, {}, [None, None]),
+            (INGREDIENTS_URL, {}, [None, 1]),
+            (RECIPES_URL, {'search': 'soup'}, ['x', 1]),
+        ]
+        for url, params, position in cases:
+            cursor = urlsafe_b64encode(
+                json.dumps({'p': position, 'r': 0}).encode('utf-8')
+            ).decode('ascii')
+            with self.subTest(url=url, params=params, position=position):
+                response = self.client.get(url, {**params, 'cursor': cursor})
+
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
+
+    def test_no_offset_or_count(self):
+        """Test deep pages are fetched without OFFSET or COUNT"""
+        for _ in range(6):
+            sample_recipe(user=self.user)
+        first = self.client.get(RECIPES_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(second.data['next'])
+
+        for query in queries.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'].upper())
+            self.assertNotIn('COUNT(', query['sql'].upper())
@@ -0,0 +1,152 @@
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import status
+from core.models import CollectionVersion, Ingredient
+from recipe.pantry import pantry_indexes
+from recipe.tests.helpers import PrivateApiTestCase, run_on_commit, \
+    sample_recipe
+
+
+PANTRY_URL = reverse('recipe:recipe-pantry')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class PantryApiTests(PrivateApiTestCase):
+    """Test matching recipes against the ingredients a user has"""
+
+    def setUp(self):
+        pantry_indexes.clear()
+        super().setUp()
+        self.eggs = Ingredient.objects.create(user=self.user, name='Eggs')
+        self.milk = Ingredient.objects.create(user=self.user, name='Milk')
+        self.flour = Ingredient.objects.create(user=self.user, name='Flour')
+        self.omelette = sample_recipe(self.user, title='Omelette')
+        self.omelette.ingredients.add(self.eggs)
+        self.pancakes = sample_recipe(self.user, title='Pancakes')
+        self.pancakes.ingredients.add(self.eggs, self.milk, self.flour)
+
+    def pantry(self, *ingredients, **params):
+        response = self.pantry_response(*ingredients, **params)
+
+        return [
+            (recipe['id'], recipe['missing'])
+            for recipe in response.data['results']
+        ]
+
+    def pantry_response(self, *ingredients, **params):
+        response = self.client.get(PANTRY_URL, {
+            'ingredients': ','.join(str(item.id) for item in ingredients),
+            **params
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response
+
+    def test_fully_covered(self):
+        """Test only recipes with every ingredient on hand are returned"""
+        self.assertEqual(
+            self.pantry(self.eggs, self.milk),
+            [(self.omelette.id, [])]
+        )
+
+    def test_missing_ranked(self):
+        """Test recipes missing up to max_missing are ranked by missing"""
+        matches = self.pantry(self.eggs, max_missing=2)
+
+        self.assertEqual(matches[0], (self.omelette.id, []))
+        self.assertEqual(matches[1][0], self.pancakes.id)
+        self.assertEqual(
+            sorted(matches[1][1]), sorted([self.milk.id, self.flour.id])
+        )
+
+    def test_index_follows_writes(self):
+        """Test the loaded index is updated in place by api writes"""
+        self.pantry(self.eggs)
+        payload = {
+            'title': 'Boiled Egg',
+            'time_minutes': 8,
+            'price': 0.50,
+            'ingredients': [self.eggs.id],
+        }
+
+        with run_on_commit():
+            self.client.post(RECIPES_URL, payload)
+            self.omelette.ingredients.add(self.milk)
+
+        with self.assertNumQueries(4):
+            # versions check, the matched recipes and their two relations,
+            # the index isn't rebuilt
+            response = self.client.get(
+                PANTRY_URL, {'ingredients': self.eggs.id}
+            )
+
+        titles = [recipe['title'] for recipe in response.data['results']]
+        self.assertEqual(titles, ['Boiled Egg'])
+
+    def test_deleted_ingredient_unlinked(self):
+        """Test deleting an ingredient removes it from every recipe"""
+        self.pantry(self.eggs)
+
+        with run_on_commit():
+            self.milk.delete()
+            self.flour.delete()
+
+        self.assertEqual(
+            [recipe_id for recipe_id, _missing in self.pantry(self.eggs)],
+            [self.omelette.id, self.pancakes.id]
+        )
+
+    def test_rolled_back_write_not_indexed(self):
+        """Test a write that is rolled back doesn't change the index"""
+        self.pantry(self.eggs)
+
+        with run_on_commit():
+            try:
+                with transaction.atomic():
+                    self.omelette.ingredients.add(self.milk)
+                    raise ValueError
+            except ValueError:
+                pass
+
+        index = pantry_indexes.loaded(self.user.pk)
+        self.assertEqual(index.unpack(index.bits[self.omelette.id]),
+                         [self.eggs.id])
+
+    def test_paginated(self):
+        """Test matches past the first page are reached through the next
+        link, ranked across pages"""
+        bread = sample_recipe(self.user, title='Bread')
+        bread.ingredients.add(self.flour)
+
+        response = self.pantry_response(self.eggs, max_missing=2,
+                                        page_size=2)
+        first = [recipe['id'] for recipe in response.data['results']]
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        second = [recipe['id'] for recipe in response.data['results']]
+
+        self.assertEqual(first, [self.omelette.id, bread.id])
+        self.assertEqual(second, [self.pancakes.id])
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        """Test a cursor that isn't a pantry position is rejected"""
+        response = self.client.get(PANTRY_URL, {'cursor': 'invalid'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuilt_after_other_process_write(self):
+        """Test a version bumped elsewhere rebuilds the index"""
+        self.pantry(self.eggs)
+        index = pantry_indexes.loaded(self.user.pk)
+        index.versions[CollectionVersion.RECIPES] -= 1
+
+        self.assertEqual(self.pantry(self.eggs), [(self.omelette.id, [])])
+        self.assertIsNot(pantry_indexes.loaded(self.user.pk), index)
+
+    def test_invalid_max_missing(self):
+        """Test a negative max_missing is rejected"""
+        response = self.client.get(PANTRY_URL, {'max_missing': -1})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
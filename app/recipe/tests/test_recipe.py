@@ -1,25 +1,22 @@
-from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Prefetch
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from core.models import Recipe
+from core.models import Recipe, Tag, Ingredient
 from recipe.serializers import RecipeSerializer
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe, sample_user
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
 
 
-def sample_recipe(user, **params):
-    """Create and return a sample recipe"""
-    defaults = {
-        'title': 'Sample Recipe',
-        'time_minutes': 10,
-        'price': 5.00
-    }
-    defaults.update(params)
-
-    return Recipe.objects.create(user=user, **defaults)
+def detail_url(recipe_id):
+    """Return recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
 class PublicRecipeApiTest(TestCase):
@@ -35,35 +32,24 @@ class PublicRecipeApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateRecipeApiTest(TestCase):
+class PrivateRecipeApiTest(PrivateApiTestCase):
     """Test authenticated recipe api access"""
 
-    def setUp(self):
-        self.client = APIClient()
-        self.user = get_user_model().objects.create_user(
-            'test@testmail.com',
-            'password123'
-        )
-        self.client.force_authenticate(self.user)
-
     def test_retrieve_recipes(self):
         """Test retrieving a list of recipes"""
         sample_recipe(user=self.user)
         sample_recipe(user=self.user)
 
         response = self.client.get(RECIPES_URL)
-        recipes = Recipe.objects.all().order_by('id')
+        recipes = Recipe.objects.all().order_by('-title', '-id')
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """Test retrieving recipes for a user"""
-        user2 = get_user_model().objects.create_user(
-            'another@testmail.com',
-            'password123'
-        )
+        user2 = sample_user('another@testmail.com')
         sample_recipe(user=self.user)
         sample_recipe(user=user2)
 
@@ -73,5 +59,227 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'], serializer.data)
+
+    def add_recipes(self, count):
+        """Create recipes that each have two tags and two ingredients"""
+        start = Recipe.objects.count()
+        for index in range(start, start + count):
+            recipe = sample_recipe(user=self.user, title=str(index))
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name='Tag ' + str(index)),
+                Tag.objects.create(user=self.user, name='Other ' + str(index)),
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(
+                    user=self.user, name='Salt ' + str(index)
+                ),
+                Ingredient.objects.create(
+                    user=self.user, name='Pepper ' + str(index)
+                ),
+            )
+
+    def count_queries(self, url):
+        """Return the number of queries issued fetching url"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return len(queries)
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes does not query per recipe"""
+        self.add_recipes(2)
+        small = self.count_queries(RECIPES_URL)
+
+        self.add_recipes(20)
+        large = self.count_queries(RECIPES_URL)
+
+        self.assertEqual(small, large)
+
+    def test_list_includes_related_ids(self):
+        """Test prefetched tags and ingredients are serialized"""
+        self.add_recipes(3)
+
+        response = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.order_by('-title', '-id').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredients', queryset=Ingredient.objects.order_by('id')
+            ),
+        )
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(response.data['results'], serializer.data)
+
+    def test_detail_query_count_constant(self):
+        """Test retrieving a recipe does not query per related object"""
+        self.add_recipes(1)
+        recipe = Recipe.objects.get()
+        small = self.count_queries(detail_url(recipe.id))
+
+        recipe.tags.add(*[
+            Tag.objects.create(user=self.user, name=str(index))
+            for index in range(10)
+        ])
+        large = self.count_queries(detail_url(recipe.id))
+
+        self.assertEqual(small, large)
+
+    def create_payload(self, ingredient_count):
+        """Return a recipe payload with ingredient_count new ingredients"""
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=str(index))
+            for index in range(ingredient_count)
+        ]
+        tag, _created = Tag.objects.get_or_create(
+            user=self.user, name='Dessert'
+        )
+
+        return {
+            'title': 'Cheesecake',
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            'tags': [tag.id],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+
+    def test_create_recipe_with_tags_and_ingredients(self):
+        """Test creating a recipe writes its related objects"""
+        payload = self.create_payload(3)
+
+        response = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=response.data['id'])
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('id', flat=True)),
+            sorted(payload['ingredients'])
+        )
+        self.assertEqual(
+            list(recipe.tags.values_list('id', flat=True)),
+            payload['tags']
+        )
+        self.assertEqual(
+            sorted(response.data['ingredients']),
+            sorted(payload['ingredients'])
+        )
+
+    def test_create_recipe_query_count_constant(self):
+        """Test validating and writing ingredients does not query per id"""
+        payload = self.create_payload(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(RECIPES_URL, payload)
+
+        Ingredient.objects.all().delete()
+        payload = self.create_payload(40)
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(len(small), len(large))
+
+    def test_create_recipe_with_tag_names(self):
+        """Test tags given by name are created or reused"""
+        payload = self.create_payload(1)
+        existing = Tag.objects.get(user=self.user, name='Dessert')
+        payload['tags'] = [
+            existing.id, {'name': 'Vegan'}, {'name': ' Dessert '},
+        ]
+        tags_etag = self.client.get(TAGS_URL)['ETag']
+
+        response = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        vegan = Tag.objects.get(user=self.user, name='Vegan')
+        self.assertEqual(
+            sorted(response.data['tags']), sorted([existing.id, vegan.id])
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertNotEqual(self.client.get(TAGS_URL)['ETag'], tags_etag)
+
+    def test_update_recipe_with_ingredient_names(self):
+        """Test ingredients given by name are linked on update"""
+        recipe = sample_recipe(user=self.user)
+
+        response = self.client.patch(detail_url(recipe.id), {
+            'ingredients': [{'name': 'Salt'}, {'name': 'Pepper'}]
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['Pepper', 'Salt']
+        )
+
+    def test_create_recipe_with_invalid_tag_name(self):
+        """Test blank names are rejected without creating anything"""
+        payload = self.create_payload(1)
+        payload['tags'] = [{'name': 'Vegan'}, {'name': ' '}]
+
+        response = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', response.data)
+        self.assertFalse(Tag.objects.filter(name='Vegan').exists())
+
+    def test_create_recipe_with_other_users_tag(self):
+        """Test a recipe cannot reference another user's tag"""
+        user2 = sample_user('another@testmail.com')
+        payload = self.create_payload(1)
+        payload['tags'] = [Tag.objects.create(user=user2, name='Vegan').id]
+
+        response = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_with_invalid_ingredient_id(self):
+        """Test non numeric ingredient ids are rejected"""
+        payload = self.create_payload(1)
+        payload['ingredients'] = ['salt']
+
+        response = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ingredients', response.data)
+
+    def test_full_update_replaces_related(self):
+        """Test updating a recipe only keeps the submitted ingredients"""
+        recipe = sample_recipe(user=self.user)
+        kept = Ingredient.objects.create(user=self.user, name='Flour')
+        removed = Ingredient.objects.create(user=self.user, name='Eggs')
+        added = Ingredient.objects.create(user=self.user, name='Milk')
+        recipe.ingredients.add(kept, removed)
+        payload = {
+            'title': 'Pancakes',
+            'ingredients': [kept.id, added.id],
+            'tags': [],
+            'time_minutes': 15,
+            'price': 2.00
+        }
+
+        response = self.client.put(detail_url(recipe.id), payload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('id', flat=True)),
+            sorted([kept.id, added.id])
+        )
+        self.assertEqual(
+            sorted(response.data['ingredients']),
+            sorted([kept.id, added.id])
+        )
+
+    def test_partial_update_keeps_related(self):
+        """Test patching other fields leaves the tags untouched"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+
+        response = self.client.patch(detail_url(recipe.id), {'title': 'Eggs'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tags'], [tag.id])
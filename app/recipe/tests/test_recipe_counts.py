@@ -0,0 +1,92 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from core.models import Ingredient, Tag
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe, sample_user
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class RecipeCountApiTests(PrivateApiTestCase):
+    """Test recipe counts and assigned_only on tag and ingredient lists"""
+
+    def setUp(self):
+        super().setUp()
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.unused = Tag.objects.create(user=self.user, name='Unused')
+        for title in ('Salad', 'Soup'):
+            sample_recipe(self.user, title=title).tags.add(self.vegan)
+
+    def test_assigned_only(self):
+        """Test only tags used by a recipe are listed"""
+        response = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(
+            [tag['id'] for tag in response.data['results']], [self.vegan.id]
+        )
+
+    def test_assigned_only_uses_counter(self):
+        """Test filtering doesn't join the through table"""
+        with self.assertNumQueries(2) as queries:
+            # the etag versions and the page
+            self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+
+        self.assertNotIn('core_recipe_ingredients', queries[-1]['sql'])
+
+    def test_with_counts(self):
+        """Test recipe_count is only returned when asked for"""
+        plain = self.client.get(TAGS_URL)
+        counted = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.assertNotIn('recipe_count', plain.data['results'][0])
+        self.assertEqual(counted.data['results'], [
+            {'id': self.vegan.id, 'name': 'Vegan', 'recipe_count': 2},
+            {'id': self.unused.id, 'name': 'Unused', 'recipe_count': 0},
+        ])
+
+    def test_counts_change_etag(self):
+        """Test linking a recipe changes the etag of counted lists only"""
+        plain = self.client.get(TAGS_URL)
+        counted = self.client.get(TAGS_URL, {'with_counts': 1})
+
+        self.client.post(reverse('recipe:recipe-list'), {
+            'title': 'Stew', 'time_minutes': 60, 'price': 4.00,
+            'tags': [self.unused.id],
+        })
+
+        self.assertEqual(self.client.get(TAGS_URL)['ETag'], plain['ETag'])
+        recounted = self.client.get(TAGS_URL, {'with_counts': 1})
+        self.assertNotEqual(recounted['ETag'], counted['ETag'])
+        self.assertEqual(recounted.data['results'][1]['recipe_count'], 1)
+
+
+class ReconcileRecipeCountsCommandTests(TestCase):
+    """Test the reconcile_recipe_counts command"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        sample_recipe(self.user).ingredients.add(self.rice)
+        Ingredient.objects.filter(id=self.rice.id).update(recipe_count=4)
+
+    def test_reports_drift(self):
+        """Test drifted counters are reported and left alone"""
+        out = StringIO()
+
+        call_command('reconcile_recipe_counts', stdout=out)
+
+        self.assertIn('ingredients: 1 drifted', out.getvalue())
+        self.assertIn('recipe_count 4 actual 1', out.getvalue())
+        self.rice.refresh_from_db()
+        self.assertEqual(self.rice.recipe_count, 4)
+
+    def test_fix_drift(self):
+        """Test --fix corrects the drifted counters"""
+        call_command('reconcile_recipe_counts', fix=True, stdout=StringIO())
+
+        self.rice.refresh_from_db()
+        self.assertEqual(self.rice.recipe_count, 1)
+        self.assertFalse(Ingredient.objects.drifted().exists())
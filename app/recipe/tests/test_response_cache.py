@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import ResponseCache, response_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class ResponseCacheTests(TestCase):
+    """Test the rendered response cache"""
+
+    def test_evicts_over_byte_cap(self):
+        """Test the least recently used bodies are evicted past max_bytes"""
+        cache = ResponseCache(max_size=10, max_bytes=10)
+        response = HttpResponse(b'12345', content_type='application/json')
+
+        for key in 'abc':
+            cache.set_response(key, response, 1, ['tags'])
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(cache.weight, 10)
+        self.assertEqual(cache.stats()['hit_ratio'], 0.5)
+
+    def test_invalidate_collection(self):
+        """Test invalidating drops only the given user's collection"""
+        cache = ResponseCache(max_size=10)
+        response = HttpResponse(b'[]', content_type='application/json')
+        cache.set_response('a', response, 1, ['tags'])
+        cache.set_response('b', response, 1, ['ingredients'])
+        cache.set_response('c', response, 2, ['tags'])
+
+        cache.invalidate(1, 'tags')
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+class CachedListApiTests(TestCase):
+    """Test tag and ingredient lists are served from the response cache"""
+
+    def setUp(self):
+        response_cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_repeat_list_served_from_cache(self):
+        """Test an unchanged list is returned without querying it again"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        # only the collection version lookup for the ETag
+        with self.assertNumQueries(1):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(response_cache.stats()['hit_ratio'], 0.5)
+
+    def test_created_through_api_not_served_stale(self):
+        """Test creating a tag changes the listed tags"""
+        self.client.get(TAGS_URL)
+
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], 'Vegan')
+
+    def test_model_save_invalidates(self):
+        """Test saving a tag outside the api drops the cached list"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['name'], 'Vegetarian')
+
+    def test_model_delete_invalidates(self):
+        """Test deleting an ingredient drops the cached list"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.client.get(INGREDIENTS_URL)
+
+        ingredient.delete()
+        response = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual(response.json()['results'], [])
+
+    def test_recipe_relation_change_invalidates(self):
+        """Test adding a tag to a recipe drops the cached tag list"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5, price=2.00
+        )
+        self.client.get(TAGS_URL)
+        self.client.get(INGREDIENTS_URL)
+
+        recipe.tags.add(tag)
+
+        self.assertEqual(self.client.get(TAGS_URL)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(INGREDIENTS_URL)['X-Cache'], 'HIT')
+
+    def test_cache_per_user(self):
+        """Test a cached list isn't served to another user"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user(
+            'other@testmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(other)
+
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'], [])
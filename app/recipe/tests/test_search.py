@@ -0,0 +1,86 @@
+from django.urls import reverse
+from core.models import Tag, Ingredient
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe, sample_user
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RecipeSearchApiTests(PrivateApiTestCase):
+    """Test full text search over recipes"""
+
+    def search(self, terms, **params):
+        response = self.client.get(RECIPES_URL, {'search': terms, **params})
+
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_search_title(self):
+        """Test searching matches stemmed words in the title"""
+        curry = sample_recipe(self.user, title='Thai Green Curry')
+        sample_recipe(self.user, title='Porridge')
+
+        self.assertEqual(self.search('curries'), [curry.id])
+
+    def test_search_related_names(self):
+        """Test searching matches tag and ingredient names"""
+        vegan = sample_recipe(self.user, title='Stir Fry')
+        vegan.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        tofu = sample_recipe(self.user, title='Noodles')
+        tofu.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Tofu')
+        )
+
+        self.assertEqual(self.search('vegan'), [vegan.id])
+        self.assertEqual(self.search('tofu'), [tofu.id])
+
+    def test_title_ranked_above_ingredient(self):
+        """Test a title match ranks above an ingredient match"""
+        by_ingredient = sample_recipe(self.user, title='Pasta Bake')
+        by_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Cheese')
+        )
+        by_title = sample_recipe(self.user, title='Cheese on Toast')
+
+        self.assertEqual(
+            self.search('cheese'), [by_title.id, by_ingredient.id]
+        )
+
+    def test_search_vector_follows_changes(self):
+        """Test removing a tag and renaming an ingredient update search"""
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        ingredient = Ingredient.objects.create(user=self.user, name='Rice')
+        recipe = sample_recipe(self.user, title='Bowl')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        recipe.tags.remove(tag)
+        ingredient.name = 'Quinoa'
+        ingredient.save()
+
+        self.assertEqual(self.search('spicy'), [])
+        self.assertEqual(self.search('rice'), [])
+        self.assertEqual(self.search('quinoa'), [recipe.id])
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes aren't searched"""
+        other = sample_user('other@testmail.com')
+        sample_recipe(other, title='Curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_paginated(self):
+        """Test paging through ranked results returns each match once"""
+        recipes = [sample_recipe(self.user, title='Soup') for _ in range(5)]
+        recipes[0].tags.add(Tag.objects.create(user=self.user, name='Soup'))
+
+        ids = []
+        params = {'search': 'soup', 'page_size': 2}
+        response = self.client.get(RECIPES_URL, params)
+        while True:
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(ids[0], recipes[0].id)
+        self.assertEqual(sorted(ids), sorted(recipe.id for recipe in recipes))
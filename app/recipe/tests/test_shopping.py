@@ -0,0 +1,66 @@
+from django.urls import reverse
+from rest_framework import status
+from core.models import Ingredient
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe, sample_user
+
+
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
+
+
+class ShoppingListApiTests(PrivateApiTestCase):
+    """Test combining recipes into a shopping list"""
+
+    def get(self, *recipes):
+        return self.client.get(SHOPPING_LIST_URL, {
+            'recipes': ','.join(str(recipe.id) for recipe in recipes)
+        })
+
+    def test_shopping_list(self):
+        """Test ingredients are combined and totals summed in one query"""
+        eggs = Ingredient.objects.create(user=self.user, name='Eggs')
+        milk = Ingredient.objects.create(user=self.user, name='Milk')
+        omelette = sample_recipe(
+            self.user, title='Omelette', price=2.50, time_minutes=5
+        )
+        omelette.ingredients.add(eggs)
+        pancakes = sample_recipe(
+            self.user, title='Pancakes', price=3.00, time_minutes=20
+        )
+        pancakes.ingredients.add(eggs, milk)
+
+        with self.assertNumQueries(1):
+            response = self.get(omelette, pancakes)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_price'], '5.50')
+        self.assertEqual(response.data['total_time_minutes'], 25)
+        self.assertEqual(response.data['ingredients'], [
+            {'id': eggs.id, 'name': 'Eggs', 'recipe_count': 2},
+            {'id': milk.id, 'name': 'Milk', 'recipe_count': 1},
+        ])
+
+    def test_other_users_recipes_not_found(self):
+        """Test recipes of other users are reported and not included"""
+        other = sample_user('other@testmail.com')
+        own = sample_recipe(self.user)
+        theirs = sample_recipe(other, price=100)
+
+        response = self.get(own, theirs)
+
+        self.assertEqual(response.data['recipes'], [own.id])
+        self.assertEqual(response.data['not_found'], [theirs.id])
+        self.assertEqual(response.data['total_price'], '5.00')
+
+    def test_no_recipes(self):
+        """Test an empty selection has zero totals"""
+        response = self.get()
+
+        self.assertEqual(response.data['total_price'], '0.00')
+        self.assertEqual(response.data['ingredients'], [])
+
+    def test_too_many_recipes(self):
+        """Test the number of recipes is limited"""
+        with self.settings(SHOPPING_LIST_MAX_RECIPES=1):
+            response = self.client.get(SHOPPING_LIST_URL, {'recipes': '1,2'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,118 @@
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from core.models import Ingredient, Tag
+from recipe.similarity import similarity_indexes
+from recipe.tests.helpers import PrivateApiTestCase, run_on_commit, \
+    sample_recipe, sample_user
+
+
+def similar_url(recipe_id):
+    """Return the similar recipes url of a recipe"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class SimilarRecipesApiTests(PrivateApiTestCase):
+    """Test recommending recipes similar to another"""
+
+    def setUp(self):
+        cache.clear()
+        similarity_indexes.clear()
+        super().setUp()
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.beans = Ingredient.objects.create(user=self.user, name='Beans')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.curry = sample_recipe(self.user, title='Curry')
+        self.curry.ingredients.add(self.rice, self.beans)
+        self.curry.tags.add(self.spicy)
+        self.chilli = sample_recipe(self.user, title='Chilli')
+        self.chilli.ingredients.add(self.beans)
+        self.chilli.tags.add(self.spicy)
+        self.risotto = sample_recipe(self.user, title='Risotto')
+        self.risotto.ingredients.add(self.rice)
+        sample_recipe(self.user, title='Toast')
+
+    def similar(self, recipe, **params):
+        response = self.client.get(similar_url(recipe.id), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [
+            (item['id'], item['score']) for item in response.data['results']
+        ]
+
+    def test_similar_jaccard(self):
+        """Test recipes sharing features are ranked by jaccard score"""
+        self.assertEqual(self.similar(self.curry), [
+            (self.chilli.id, round(2 / 3, 6)),
+            (self.risotto.id, round(1 / 3, 6)),
+        ])
+
+    def test_similar_cosine(self):
+        """Test the cosine metric"""
+        matches = self.similar(self.curry, metric='cosine')
+
+        self.assertEqual(matches[0], (self.chilli.id, round(2 / 6 ** .5, 6)))
+
+    def test_index_follows_writes(self):
+        """Test links changed after the index is loaded are used"""
+        self.similar(self.curry)
+
+        with run_on_commit():
+            self.risotto.tags.add(self.spicy)
+            self.chilli.ingredients.remove(self.beans)
+            self.beans.delete()
+
+        self.assertEqual(self.similar(self.curry), [
+            (self.risotto.id, 1.0),
+            (self.chilli.id, 0.5),
+        ])
+
+    def test_rolled_back_write_not_indexed(self):
+        """Test a write that is rolled back doesn't change the index"""
+        expected = self.similar(self.curry)
+
+        with run_on_commit():
+            try:
+                with transaction.atomic():
+                    self.risotto.tags.add(self.spicy)
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(self.similar(self.curry), expected)
+
+    def test_other_users_recipe_not_found(self):
+        """Test asking for another user's recipe returns 404"""
+        other = sample_user('other@testmail.com')
+        recipe = sample_recipe(other)
+
+        response = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuild_command_fills_shared_cache(self):
+        """Test an index built by the command is loaded without a rebuild"""
+        out = StringIO()
+        call_command('rebuild_similarity_index', stdout=out)
+        similarity_indexes.clear()
+
+        # recipe lookup and its relations, versions, matched recipes and
+        # their relations; the links aren't read again
+        with self.assertNumQueries(7):
+            self.similar(self.curry)
+
+        self.assertIn('Rebuilt 1 indexes', out.getvalue())
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_rebuild_command_requires_shared_cache(self):
+        """Test the command refuses to rebuild into a cache only its own
+        process can read"""
+        with self.assertRaises(CommandError):
+            call_command('rebuild_similarity_index', stdout=StringIO())
@@ -0,0 +1,111 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from core.models import Ingredient, RecipeStats, Tag
+from recipe.stats import percentiles
+from recipe.tests.helpers import PrivateApiTestCase, sample_recipe, sample_user
+
+
+STATS_URL = reverse('recipe:stats')
+
+
+class PercentileTests(TestCase):
+    """Test nearest rank percentiles over value counts"""
+
+    def test_percentiles(self):
+        """Test percentiles are read from cumulative counts"""
+        values = [(1, 5), (2, 4), (10, 1)]
+
+        self.assertEqual(
+            percentiles(values, 10, (50, 90, 99)),
+            {50: 1, 90: 2, 99: 10}
+        )
+
+
+class RecipeStatsApiTests(PrivateApiTestCase):
+    """Test the recipe stats endpoint and its summary tables"""
+
+    def stats(self):
+        response = self.client.get(STATS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return response.data
+
+    def test_empty_stats(self):
+        """Test a user without recipes gets zero counts"""
+        stats = self.stats()
+
+        self.assertEqual(stats['recipe_count'], 0)
+        self.assertIsNone(stats['price']['average'])
+        self.assertEqual(stats['top_tags'], [])
+
+    def test_stats_follow_writes(self):
+        """Test creates, updates and deletes are counted incrementally"""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        Ingredient.objects.create(user=self.user, name='Salt')
+        cheap = sample_recipe(self.user, price=2.00, time_minutes=5)
+        cheap.tags.add(vegan, quick)
+        sample_recipe(self.user, price=4.00, time_minutes=30).tags.add(vegan)
+        pricey = sample_recipe(self.user, price=9.00, time_minutes=60)
+        sample_recipe(self.user, price=100.00).delete()
+        pricey.price = 6.00
+        pricey.save()
+        cheap.tags.remove(quick)
+
+        stats = self.stats()
+
+        self.assertEqual(stats['recipe_count'], 3)
+        self.assertEqual(stats['tag_count'], 2)
+        self.assertEqual(stats['ingredient_count'], 1)
+        self.assertEqual(stats['price']['average'], '4.00')
+        self.assertEqual(stats['price']['p50'], '4.00')
+        self.assertEqual(stats['price']['p99'], '6.00')
+        self.assertEqual(stats['time_minutes']['average'], 31.67)
+        self.assertEqual(stats['time_minutes']['p50'], 30)
+        self.assertEqual(stats['top_tags'], [
+            {'id': vegan.id, 'name': 'Vegan', 'recipe_count': 2},
+        ])
+
+    def test_stats_served_without_scanning_recipes(self):
+        """Test the endpoint only reads the summary tables"""
+        sample_recipe(self.user)
+
+        with self.assertNumQueries(5):
+            # versions, stats row, value counts, top tags and ingredients
+            self.stats()
+
+    def test_stats_limited_to_user(self):
+        """Test other users' recipes aren't counted"""
+        other = sample_user('other@testmail.com')
+        sample_recipe(other)
+
+        self.assertEqual(self.stats()['recipe_count'], 0)
+
+    def test_rebuild_command(self):
+        """Test the rebuild command repairs drifted stats"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        sample_recipe(self.user, price=3.00).tags.add(tag)
+        RecipeStats.objects.filter(user=self.user).update(recipe_count=7)
+        Tag.objects.filter(id=tag.id).update(recipe_count=5)
+
+        call_command('rebuild_recipe_stats', stdout=StringIO())
+
+        stats = self.stats()
+        self.assertEqual(stats['recipe_count'], 1)
+        self.assertEqual(stats['price']['average'], '3.00')
+        self.assertEqual(stats['top_tags'][0]['recipe_count'], 1)
+
+    def test_saving_tag_keeps_recipe_count(self):
+        """Test saving a tag loaded before links were added keeps the
+        count maintained by the database"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        sample_recipe(self.user).tags.add(tag)
+
+        tag.name = 'Plant based'
+        tag.save()
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
@@ -1,4 +1,6 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework import status
@@ -42,11 +44,11 @@ class PrivateTagsApiTests(TestCase):
 
         response = self.client.get(TAGS_URL)
 
-        tags = Tag.objects.all().order_by('-name')
+        tags = Tag.objects.all().order_by('-name', '-id')
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
+        self.assertEqual(response.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -60,8 +62,8 @@ class PrivateTagsApiTests(TestCase):
         response = self.client.get(TAGS_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['name'], tag.name)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -74,9 +76,87 @@ class PrivateTagsApiTests(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_create_existing_tag(self):
+        """Test creating a tag the user has returns the existing one"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        response = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_existing_tags(self):
+        """Test a list with existing and repeated names creates each name
+        once"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'Quick'}, {'name': 'Vegan'}, {'name': 'Quick'}]
+
+        response = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        ids = [item['id'] for item in response.data]
+        self.assertEqual(ids[1], tag.id)
+        self.assertEqual(ids[0], ids[2])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
     def test_create_tag_invalid(self):
         """Test creating a tag with ann invalid payload"""
         payload = {'name': ''}
         response = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_tags(self):
+        """Test creating a list of tags in one request"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}, {'name': 'Quick'}]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [tag['name'] for tag in response.data],
+            ['Vegan', 'Dessert', 'Quick']
+        )
+        self.assertEqual(
+            Tag.objects.filter(user=self.user).count(), len(payload)
+        )
+        inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "core_tag"')
+        ]
+        self.assertEqual(len(inserts), 1)
+
+    def test_bulk_create_tags_invalid_item(self):
+        """Test an invalid item rejects the list with errors in order"""
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+
+        response = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('name', response.data[1])
+        self.assertFalse(Tag.objects.exists())
+
+    @override_settings(BULK_CREATE_MAX_ITEMS=2)
+    def test_bulk_create_tags_too_many_items(self):
+        """Test lists over the item limit are rejected"""
+        payload = [{'name': 'One'}, {'name': 'Two'}, {'name': 'Three'}]
+
+        response = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    @override_settings(BULK_CREATE_MAX_BYTES=64)
+    def test_bulk_create_tags_body_too_large(self):
+        """Test request bodies over the size limit are rejected"""
+        payload = [{'name': 'Tag ' + str(index)} for index in range(10)]
+
+        response = self.client.post(TAGS_URL, payload, format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
@@ -0,0 +1,157 @@
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import serializers as drf_serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from core.models import Ingredient, Recipe, Tag
+from recipe import serializers
+from recipe.values import ValuesSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class ValuesSerializerTests(TestCase):
+    """Test ValuesSerializer output matches the model serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Dessert')
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Rice', 'Kale')
+        ]
+        curry = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=30,
+            price=Decimal('7.5'), link='https://example.com/curry'
+        )
+        curry.tags.add(self.tags[2], self.tags[0])
+        curry.ingredients.add(*self.ingredients)
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price=0
+        )
+
+    def assertParity(self, serializer_class, queryset, context=None):
+        """Assert both paths render the same bytes for queryset"""
+        context = context or {}
+        instances = queryset.prefetch_related('tags', 'ingredients') \
+            if queryset.model is Recipe else queryset
+        expected = serializer_class(
+            instances, many=True, context=context
+        ).data
+        values = ValuesSerializer(serializer_class(context=context))
+
+        self.assertTrue(values.supported)
+        rows = list(values.get_queryset(queryset))
+        self.assertEqual(
+            render(values.to_representation(rows)), render(expected)
+        )
+
+    def test_recipe_parity(self):
+        """Test recipes, with sorted related ids and decimal prices"""
+        self.assertParity(
+            serializers.RecipeSerializer,
+            Recipe.objects.order_by('-title', '-id')
+        )
+
+    def test_recipe_fields_parity(self):
+        """Test a sparse fieldset"""
+        self.assertParity(
+            serializers.RecipeSerializer,
+            Recipe.objects.order_by('-title', '-id'),
+            {'fields': ['price', 'tags']}
+        )
+
+    def test_tag_parity(self):
+        """Test tags with and without recipe counts"""
+        for context in ({}, {'recipe_count': True}):
+            self.assertParity(
+                serializers.TagSerializer,
+                Tag.objects.order_by('-name', '-id'),
+                context
+            )
+
+    def test_ingredient_parity(self):
+        """Test ingredients"""
+        self.assertParity(
+            serializers.IngredientSerializer,
+            Ingredient.objects.order_by('-name', '-id'),
+            {'recipe_count': True}
+        )
+
+    def test_empty_page(self):
+        """Test no rows serialize to an empty list without queries"""
+        values = ValuesSerializer(serializers.RecipeSerializer())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(values.to_representation([]), [])
+
+    def test_unsupported_field(self):
+        """Test a field not read from a column isn't supported"""
+        class NamedSerializer(serializers.TagSerializer):
+            upper = drf_serializers.SerializerMethodField()
+
+            class Meta(serializers.TagSerializer.Meta):
+                fields = ['id', 'upper']
+
+            def get_upper(self, tag):
+                return tag.name.upper()
+
+        self.assertFalse(ValuesSerializer(NamedSerializer()).supported)
+
+
+class ValuesListApiTests(TestCase):
+    """Test list endpoints served from values() rows"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@testmail.com',
+            'password123'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        for title in ('Salad', 'Soup', 'Stew'):
+            Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=3
+            ).tags.add(self.vegan)
+
+    def test_recipe_list_matches_detail(self):
+        """Test list items match the serializer's detail output"""
+        response = self.client.get(RECIPES_URL)
+
+        for item in response.data['results']:
+            detail = self.client.get(
+                reverse('recipe:recipe-detail', args=[item['id']])
+            )
+            self.assertEqual(render(item), render(detail.data))
+
+    def test_list_queries(self):
+        """Test a page is the versions, the rows and one query per
+        relation"""
+        with self.assertNumQueries(4):
+            self.client.get(RECIPES_URL)
+        with self.assertNumQueries(2):
+            self.client.get(TAGS_URL, {'with_counts': 1, 'page_size': 1})
+
+    def test_list_cursor(self):
+        """Test the cursor is read from values() rows"""
+        first = self.client.get(RECIPES_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual(
+            [item['title'] for item in second.data['results']], ['Salad']
+        )
@@ -0,0 +1,164 @@
+from collections import defaultdict
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+
+# fields whose to_representation returns a database value unchanged
+PLAIN_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+)
+
+
+def is_plain(field):
+    return any(
+        type(field).to_representation is field_class.to_representation
+        for field_class in PLAIN_FIELDS
+    )
+
+
+def coerces_to_string(field):
+    """Return whether a DecimalField is rendered as a string, which is only
+    set on the field when it is given as an argument"""
+    return getattr(
+        field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING
+    )
+
+
+def decimal_string(value):
+    # the column scale is the field's decimal_places, so the value is
+    # already quantized and only needs formatting
+    return '{:f}'.format(value)
+
+
+class ValuesSerializer:
+    """Read only counterpart of a ModelSerializer instance that builds the
+    same output from values() rows instead of model instances.
+
+    Each field is mapped once to a column and a converter, and many to
+    many primary keys are read from the through table for the whole page
+    in one query per relation. supported is False when a field can't be
+    read from a column, and the serializer must be used instead"""
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        # (name, column attname or annotation, or None for a relation,
+        # converter) in the serializer's field order
+        self.fields = []
+        self.related = {}
+        self.supported = True
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, ManyRelatedField):
+                if self.add_related(name, field):
+                    continue
+            elif '.' not in field.source and self.add_column(name, field):
+                continue
+            self.supported = False
+
+    def get_model_field(self, source):
+        try:
+            return self.model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+
+    def add_column(self, name, field):
+        """Map a field to a model column, or an annotation of the model's
+        manager such as the ingredient name, False if it isn't one"""
+        model_field = self.get_model_field(field.source)
+        if model_field is None:
+            return self.add_annotation(name, field)
+        if not model_field.concrete or model_field.many_to_many:
+            return False
+
+        if is_plain(field):
+            convert = None
+        elif type(field) is serializers.DecimalField and \
+                coerces_to_string(field) and not field.localize and \
+                field.decimal_places == model_field.decimal_places:
+            convert = decimal_string
+        else:
+            convert = field.to_representation
+        self.fields.append((name, model_field.attname, convert))
+
+        return True
+
+    def add_annotation(self, name, field):
+        """Map a plain field to an annotation of the model's manager, False
+        if it isn't one"""
+        annotations = self.model._default_manager.get_queryset(
+        ).query.annotations
+        if field.source not in annotations or not is_plain(field):
+            return False
+
+        self.fields.append((name, field.source, None))
+
+        return True
+
+    def add_related(self, name, field):
+        """Map a many to many field of primary keys to its through table,
+        False if it isn't one"""
+        child = field.child_relation
+        if not isinstance(child, PrimaryKeyRelatedField) or \
+                child.pk_field is not None:
+            return False
+        model_field = self.get_model_field(field.source)
+        if model_field is None or not model_field.many_to_many:
+            return False
+
+        self.fields.append((name, None, None))
+        self.related[name] = model_field
+
+        return True
+
+    def get_queryset(self, queryset):
+        """Return queryset as values() rows with the serialized columns and
+        those it is ordered by, for the paginator's cursor"""
+        names = ['pk'] + [attname for _name, attname, _convert
+                          in self.fields if attname is not None]
+        for ordering in queryset.query.order_by:
+            name = ordering.lstrip('-')
+            if name not in names:
+                names.append(name)
+
+        return queryset.prefetch_related(None).values(*names)
+
+    def related_ids(self, model_field, pks):
+        """Return a map of pk to the related primary keys, in key order"""
+        source = model_field.m2m_column_name()
+        target = model_field.m2m_reverse_name()
+        ids = defaultdict(list)
+        links = model_field.remote_field.through.objects.filter(
+            **{source + '__in': pks}
+        ).order_by(source, target).values_list(source, target)
+        for pk, related_id in links:
+            ids[pk].append(related_id)
+
+        return ids
+
+    def to_representation(self, rows):
+        """Return the serialized data of a page of values() rows"""
+        pks = [row['pk'] for row in rows]
+        related = {
+            name: self.related_ids(model_field, pks)
+            for name, model_field in self.related.items()
+        } if pks else {}
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, attname, convert in self.fields:
+                if attname is None:
+                    item[name] = related[name].get(row['pk'], [])
+                    continue
+                value = row[attname]
+                if convert is not None and value is not None:
+                    value = convert(value)
+                item[name] = value
+            data.append(item)
+
+        return data
@@ -1,45 +1,442 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Prefetch
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
-from core.models import Tag, Ingredient, Recipe
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.models import Tag, Ingredient, Recipe, CollectionVersion
 from recipe import serializers
+from recipe.autocomplete import name_indexes
+from recipe.exceptions import RequestTooLarge
+from recipe.export import export_recipes
+from recipe.filters import MATCH_ALL, MATCH_ANY, filter_related, \
+    parse_fields, parse_ids
+from recipe.importer import RecipeImporter
+from recipe.mixins import CachedListMixin, ValuesListMixin, \
+    VersionedCollectionMixin
+from recipe.pantry import pantry_indexes
+from recipe.renderers import NDJSONRenderer, CSVRenderer, \
+    JSONStreamRenderer
+from recipe.shopping import shopping_list
+from recipe.similarity import JACCARD, METRICS, similarity_indexes
+from recipe.stats import recipe_stats
+from user.authentication import CachedTokenAuthentication
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+# the collections of the tags and ingredients a recipe links to
+RELATED_COLLECTIONS = {
+    'tags': CollectionVersion.TAGS,
+    'ingredients': CollectionVersion.INGREDIENTS,
+}
+
+
+class BaseRecipeAttrViewSet(VersionedCollectionMixin,
+                            ValuesListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for tags and ingredients viewsets"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    # safe requests read from a replica, see core.routers
+    replica_reads = True
 
     def get_queryset(self):
-        """Return tag or ingredients for the current authenticated user"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        """Return tag or ingredients for the current authenticated user,
+        only those used by a recipe with ?assigned_only=1"""
+        queryset = self.queryset.filter(user=self.request.user)
+        # recipe_count is a counter kept by triggers, so this doesn't join
+        # the recipe through table
+        if self.query_flag('assigned_only'):
+            queryset = queryset.filter(recipe_count__gt=0)
+
+        return queryset.order_by('-name', '-id')
+
+    def query_flag(self, name):
+        """Return whether a 0/1 query parameter is set"""
+        return self.request.query_params.get(name, '0') not in ('', '0')
+
+    def get_serializer_context(self):
+        """Include recipe_count in the results with ?with_counts=1"""
+        context = super().get_serializer_context()
+        context['recipe_count'] = self.query_flag('with_counts')
+
+        return context
+
+    def get_etag_resources(self):
+        """Include recipes when the results depend on how they use the
+        tags or ingredients"""
+        resources = super().get_etag_resources()
+        if self.query_flag('assigned_only') or self.query_flag('with_counts'):
+            resources += (CollectionVersion.RECIPES,)
+
+        return resources
+
+    def create(self, request, *args, **kwargs):
+        """Create a tag or ingredient, or a list of them in one insert"""
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        if content_length > settings.BULK_CREATE_MAX_BYTES:
+            raise RequestTooLarge()
+
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        if len(request.data) > settings.BULK_CREATE_MAX_ITEMS:
+            raise ValidationError(
+                _('Ensure this list has no more than {max_items} items.')
+                .format(max_items=settings.BULK_CREATE_MAX_ITEMS)
+            )
+
+        # errors and results are both returned in request order
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def perform_create(self, serializer):
         """Create a new tag or ingredient"""
         serializer.save(user=self.request.user)
+        self.bump_version()
+
+    @action(detail=False)
+    def autocomplete(self, request):
+        """Return the tags or ingredients whose names start with ?prefix=
+        or contain ?q=, up to ?limit= of them"""
+        return self.conditional_response(request, self.autocomplete_results)
+
+    def autocomplete_results(self, request):
+        params = request.query_params
+        prefix = params.get('prefix', '').strip()
+        q = params.get('q', '').strip()
+        if not prefix and not q:
+            raise ValidationError({
+                'prefix': _('Expected ?prefix= or ?q= to be given.')
+            })
+
+        config = settings.AUTOCOMPLETE
+        try:
+            limit = int(params.get('limit', config['LIMIT']))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError({
+                'limit': _('Expected a whole number of 1 or more.')
+            })
+        limit = min(limit, config['MAX_LIMIT'])
 
+        index = name_indexes[self.queryset.model].get(request.user)
+        if q:
+            ids = index.search(q, limit)
+        else:
+            ids = index.prefix(prefix, limit)
+        matches = self.get_queryset().in_bulk(ids)
 
-class TagViewSet(BaseRecipeAttrViewSet):
+        return Response({'results': self.get_serializer(
+            [matches[pk] for pk in ids if pk in matches], many=True
+        ).data})
+
+
+class TagViewSet(CachedListMixin, BaseRecipeAttrViewSet):
     """Manage Tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    collection = CollectionVersion.TAGS
 
 
-class IngredientViewSet(BaseRecipeAttrViewSet):
+class IngredientViewSet(CachedListMixin, BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    collection = CollectionVersion.INGREDIENTS
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(VersionedCollectionMixin, ValuesListMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    collection = CollectionVersion.RECIPES
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    replica_reads = True
 
     def get_queryset(self):
-        """Return recipes for the current authenticated user"""
-        return self.queryset.filter(user=self.request.user).order_by('-title')
+        """Return recipes for the current authenticated user, loading only
+        the columns and relations of the ?fields= being read"""
+        queryset = self.queryset.filter(user=self.request.user)
+        fields = self.get_fields()
+        # the serializer only needs the related ids, fetch them for the
+        # whole page in one query per relation instead of one per recipe,
+        # in id order like the values() list path
+        for field_name, model in (('tags', Tag),
+                                  ('ingredients', Ingredient)):
+            if fields is None or field_name in fields:
+                queryset = queryset.prefetch_related(
+                    Prefetch(field_name, queryset=model.objects.only(
+                        'id'
+                    ).order_by('id'))
+                )
+
+        if self.action != 'list':
+            queryset = queryset.order_by('-title', '-id')
+        else:
+            queryset = self.filter_related(queryset)
+            search = self.request.query_params.get('search', '').strip()
+            if search:
+                queryset = self.search_queryset(queryset, search)
+            else:
+                queryset = queryset.order_by('-title', '-id')
+
+        if fields is not None:
+            queryset = self.only_fields(queryset, fields)
+
+        return queryset
+
+    def get_fields(self):
+        """Return the ?fields= requested on reads, None for all of them"""
+        if self.request.method != 'GET' or \
+                'fields' not in self.request.query_params:
+            return None
+
+        return parse_fields(
+            'fields',
+            self.request.query_params['fields'],
+            self.get_serializer_class().Meta.fields
+        ) or None
+
+    def only_fields(self, queryset, fields):
+        """Defer the columns neither serialized nor needed for the page
+        ordering, which the paginator reads from every row"""
+        columns = {'id'}
+        for field_name in list(fields) + [
+            name.lstrip('-') for name in queryset.query.order_by
+        ]:
+            try:
+                field = Recipe._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                # annotations such as the search rank
+                continue
+            if field.concrete and not field.many_to_many:
+                columns.add(field.name)
+
+        return queryset.only(*columns)
+
+    def get_serializer_context(self):
+        """Limit the serialized fields to ?fields= on reads"""
+        context = super().get_serializer_context()
+        context['fields'] = self.get_fields()
+
+        return context
+
+    def filter_related(self, queryset):
+        """Filter by the ?tags= and ?ingredients= id lists, matching any
+        or, with ?match=all, all of the ids of each"""
+        params = self.request.query_params
+        match = params.get('match', MATCH_ANY)
+        if match not in (MATCH_ANY, MATCH_ALL):
+            raise ValidationError({
+                'match': _('Expected one of: {}, {}.').format(
+                    MATCH_ANY, MATCH_ALL
+                )
+            })
+
+        for field_name in ('tags', 'ingredients'):
+            ids = parse_ids(field_name, params.get(field_name, ''))
+            if ids:
+                queryset = filter_related(queryset, field_name, ids, match)
+
+        return queryset
+
+    def search_queryset(self, queryset, search):
+        """Return the recipes matching search, best matches first"""
+        query = SearchQuery(search, config=Recipe.search_config)
+
+        # matches come from the GIN index on search_vector, only those are
+        # ranked. The rank is cast to double precision so the cursor value
+        # compares equal to the stored rank
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        ).order_by('-rank', '-id')
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return a recipe, or 304 if the client's copy is current"""
+        return self.conditional_response(
+            request, super().retrieve, *args, **kwargs
+        )
+
+    def perform_create(self, serializer):
+        """Create a new recipe"""
+        serializer.save(user=self.request.user)
+        self.bump_saved_versions(serializer)
+
+    def perform_update(self, serializer):
+        """Update a recipe"""
+        serializer.save()
+        self.bump_saved_versions(serializer)
+
+    def bump_saved_versions(self, serializer):
+        """Bump recipes and the collections that tags or ingredients given
+        by name may have been created in"""
+        self.bump_version(self.collection, *(
+            RELATED_COLLECTIONS[field_name]
+            for field_name in serializer.named_fields
+        ))
+
+    def perform_destroy(self, instance):
+        """Delete a recipe"""
+        instance.delete()
+        self.bump_version()
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_recipes(self, request):
+        """Import recipes from a newline delimited JSON request body"""
+        # iterating the stream reads the body a line at a time
+        importer = RecipeImporter(
+            request.user,
+            batch_size=settings.RECIPE_IMPORT_BATCH_SIZE
+        )
+        report = importer.run(request.stream or [])
+
+        return Response(report)
+
+    @action(detail=False, renderer_classes=[
+        NDJSONRenderer, CSVRenderer, JSONStreamRenderer
+    ])
+    def export(self, request):
+        """Stream all of the user's recipes as NDJSON, CSV or a JSON
+        array"""
+        renderer = request.accepted_renderer
+        rows = export_recipes(
+            request.user,
+            chunk_size=settings.RECIPE_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            renderer.iter_render(rows),
+            content_type=renderer.media_type
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="recipes.{}"'.format(renderer.format)
+
+        return response
+
+    @action(detail=False)
+    def pantry(self, request):
+        """Return the recipes that can be made from the ?ingredients= ids,
+        or are missing at most ?max_missing= of theirs, fewest missing
+        first and paginated by a cursor over (missing count, id)"""
+        ingredient_ids = parse_ids(
+            'ingredients', request.query_params.get('ingredients', '')
+        )
+        try:
+            max_missing = int(request.query_params.get('max_missing', 0))
+        except ValueError:
+            max_missing = -1
+        if max_missing < 0:
+            raise ValidationError({
+                'max_missing': _('Expected a whole number of 0 or more.')
+            })
+
+        index = pantry_indexes.get(request.user)
+
+        def fetch(after, limit):
+            return [
+                {'missing_count': count, 'id': recipe_id, 'bits': missing}
+                for count, missing, recipe_id in index.match(
+                    ingredient_ids, max_missing, limit=limit, after=after
+                )
+            ]
+
+        matches = self.paginator.paginate_ranked(
+            request, fetch, ('missing_count', 'id')
+        )
+        recipes = self.get_queryset().in_bulk(
+            [match['id'] for match in matches]
+        )
+
+        results = []
+        for match in matches:
+            if match['id'] not in recipes:
+                continue
+            data = self.get_serializer(recipes[match['id']]).data
+            data['missing'] = index.unpack(match['bits'])
+            results.append(data)
+
+        return self.paginator.get_paginated_response(results)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """Return the user's recipes sharing the most ingredients and tags
+        with this one, by ?metric=jaccard (default) or cosine"""
+        recipe = self.get_object()
+        metric = request.query_params.get('metric', JACCARD)
+        if metric not in METRICS:
+            raise ValidationError({
+                'metric': _('Expected one of: {}.').format(', '.join(METRICS))
+            })
+
+        matches = similarity_indexes.get(request.user).similar(
+            recipe.pk,
+            self.paginator.get_page_size(request),
+            metric=metric
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _score, recipe_id in matches]
+        )
+
+        results = []
+        for score, recipe_id in matches:
+            if recipe_id not in recipes:
+                continue
+            data = self.get_serializer(recipes[recipe_id]).data
+            data['score'] = round(score, 6)
+            results.append(data)
+
+        return Response({'results': results})
+
+    @action(detail=False, url_path='shopping-list')
+    def shopping_list(self, request):
+        """Return the combined ingredients and total price and time of the
+        ?recipes= ids"""
+        recipe_ids = parse_ids(
+            'recipes', request.query_params.get('recipes', '')
+        )
+        if len(recipe_ids) > settings.SHOPPING_LIST_MAX_RECIPES:
+            raise ValidationError({
+                'recipes': _('Ensure there are no more than {max_items} '
+                             'ids.').format(
+                    max_items=settings.SHOPPING_LIST_MAX_RECIPES
+                )
+            })
+
+        data = shopping_list(request.user, recipe_ids)
+        data['total_price'] = '{:.2f}'.format(data['total_price'])
+
+        return Response(data)
+
+
+class RecipeStatsView(VersionedCollectionMixin, APIView):
+    """Summarise the authenticated user's recipes"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get_etag_resources(self):
+        return (
+            CollectionVersion.RECIPES,
+            CollectionVersion.TAGS,
+            CollectionVersion.INGREDIENTS,
+        )
+
+    def get(self, request, *args, **kwargs):
+        """Return the stats, or 304 if the client's copy is current"""
+        return self.conditional_response(request, self.stats)
+
+    def stats(self, request):
+        return Response(recipe_stats(request.user))
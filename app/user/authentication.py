@@ -0,0 +1,161 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import DEFERRED
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from core.cache import LRUCache
+
+
+class TokenCache:
+    """Two tier cache of token key to (user id, is_active, token key)
+    lookups.
+
+    Lookups are served from an in process LRU first and then from the
+    configured Django cache, which is shared between processes. Shared
+    entries are stored under a generation of their token key, which
+    invalidate increments, so a lookup read from the database before an
+    invalidation and cached after it is never found. Local entries keep
+    the generation they were loaded at and are dropped on a hit once it
+    moved, so an invalidation in another process applies to them too"""
+    key_prefix = 'auth-token:'
+    generation_prefix = 'auth-token-generation:'
+
+    def __init__(self):
+        config = settings.TOKEN_AUTH_CACHE
+        self.alias = config['ALIAS']
+        self.ttl = config['TTL']
+        self.local = LRUCache(config['LOCAL_MAX_SIZE'], config['LOCAL_TTL'])
+        # generations of invalidated keys when there is no shared cache
+        self.generations = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def generation(self, key):
+        """Return the current generation of key, read it before loading
+        the credentials that are passed to set"""
+        if self.shared is None:
+            return self.generations.get(key, 0)
+
+        return self.shared.get(self.generation_prefix + key, 0)
+
+    def entry_key(self, key, generation):
+        return '{}{}:{}'.format(self.key_prefix, key, generation)
+
+    def get(self, key):
+        """Return the cached (user id, is_active, token key) for key or
+        None"""
+        credentials = None
+        generation = self.generation(key)
+        entry = self.local.get(key)
+        if entry is not None:
+            if entry[1] == generation:
+                credentials = entry[0]
+            else:
+                self.local.delete(key)
+        if credentials is None and self.shared is not None:
+            credentials = self.shared.get(self.entry_key(key, generation))
+            if credentials is not None:
+                self.local.set(key, (credentials, generation))
+
+        if credentials is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return credentials
+
+    def set(self, key, credentials, generation):
+        """Cache the credentials of key, loaded at generation. They are
+        dropped if key was invalidated since"""
+        if self.shared is not None:
+            self.shared.set(
+                self.entry_key(key, generation), credentials, self.ttl
+            )
+        self.local.set(key, (credentials, generation))
+
+    def invalidate(self, *keys):
+        """Remove the given token keys from both tiers"""
+        for key in keys:
+            self.bump(key)
+            self.local.delete(key)
+
+    def bump(self, key):
+        """Move key to its next generation"""
+        if self.shared is None:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            return
+
+        generation_key = self.generation_prefix + key
+        # generations outlive every entry, or an expired one would start
+        # over at a generation that still has entries
+        if not self.shared.add(generation_key, 1, None):
+            try:
+                self.shared.incr(generation_key)
+            except ValueError:
+                # evicted since the add
+                self.shared.add(generation_key, 1, None)
+
+    def invalidate_user(self, user):
+        """Remove every cached token belonging to user"""
+        self.invalidate(*Token.objects.filter(
+            user_id=user.pk
+        ).values_list('key', flat=True))
+
+    def clear(self):
+        """Empty the local tier and reset the counters"""
+        self.local.clear()
+        self.generations.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return the hit and miss counters of the cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'local': self.local.stats(),
+        }
+
+
+token_cache = TokenCache()
+
+
+def deferred_instance(model, **values):
+    """Return an instance of model with only the given attributes loaded,
+    any other is read from the database when it is accessed and saving it
+    only writes the loaded ones"""
+    return model.from_db(DEFAULT_DB_ALIAS, list(values), [
+        values.get(field.attname, DEFERRED)
+        for field in model._meta.concrete_fields
+    ])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user lookup.
+
+    Only the ids are cached, each request gets its own user and token
+    instances with the other fields deferred"""
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            generation = token_cache.generation(key)
+            # inactive users and unknown tokens raise here and aren't cached
+            user, token = super().authenticate_credentials(key)
+            credentials = (user.pk, user.is_active, token.key)
+            token_cache.set(key, credentials, generation)
+
+        user_id, is_active, token_key = credentials
+        user = deferred_instance(
+            get_user_model(), id=user_id, is_active=is_active
+        )
+        token = deferred_instance(Token, key=token_key, user_id=user_id)
+        token.user = user
+
+        return user, token
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from user.authentication import CachedTokenAuthentication, token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test caching token to user lookups"""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@hotmail.com',
+            password='password123',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+    def test_repeat_lookup_served_from_cache(self):
+        """Test a second request with a token doesn't query the database"""
+        self.authentication.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(
+                self.token.key
+            )
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+        self.assertEqual(token_cache.hits, 1)
+        self.assertEqual(token_cache.misses, 1)
+
+    def test_shared_cache_used_when_local_cache_empty(self):
+        """Test another process can use the lookup from the shared cache"""
+        self.authentication.authenticate_credentials(self.token.key)
+        token_cache.local.clear()
+
+        with self.assertNumQueries(0):
+            user, _token = self.authentication.authenticate_credentials(
+                self.token.key
+            )
+
+        self.assertEqual(user, self.user)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating immediately"""
+        key = self.token.key
+        self.authentication.authenticate_credentials(key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(key)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user stops their token authenticating"""
+        self.authentication.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(self.token.key)
+
+    def test_password_change_invalidates_cache(self):
+        """Test updating the password drops the cached user"""
+        self.client.get(ME_URL)
+
+        response = self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(token_cache.local.get(self.token.key))
+        user, _token = self.authentication.authenticate_credentials(
+            self.token.key
+        )
+        self.assertTrue(user.check_password('newpassword123'))
+
+    def test_only_ids_cached(self):
+        """Test the cache holds ids rather than models, and each lookup
+        gets its own user instance"""
+        first, _token = self.authentication.authenticate_credentials(
+            self.token.key
+        )
+        second, _token = self.authentication.authenticate_credentials(
+            self.token.key
+        )
+
+        self.assertEqual(
+            token_cache.get(self.token.key),
+            (self.user.pk, True, self.token.key)
+        )
+        self.assertIsNot(first, second)
+        self.assertIn('password', first.get_deferred_fields())
+
+    def test_set_after_invalidation_dropped(self):
+        """Test credentials loaded before the token is deleted aren't
+        cached when they are set after it"""
+        key = self.token.key
+        generation = token_cache.generation(key)
+
+        self.token.delete()
+        token_cache.set(key, (self.user.pk, True, key), generation)
+
+        self.assertIsNone(token_cache.get(key))
+        token_cache.local.clear()
+        self.assertIsNone(token_cache.get(key))
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.authenticate_credentials(key)
+
+    def test_invalidation_by_other_process_applies_locally(self):
+        """Test a local entry isn't used once another process moved its
+        token to a new generation"""
+        key = self.token.key
+        self.authentication.authenticate_credentials(key)
+
+        # what invalidating the token in another process leaves behind
+        token_cache.bump(key)
+
+        self.assertIsNone(token_cache.get(key))
+        self.assertIsNone(token_cache.local.get(key))
+
+    def test_invalid_token(self):
+        """Test an unknown token fails and isn't cached"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token unknown')
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(token_cache.get('unknown'))
@@ -1,7 +1,9 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from user.authentication import CachedTokenAuthentication
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
@@ -20,9 +22,12 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage an authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
+    # safe requests read from a replica, see core.routers
+    replica_reads = True
 
     def get_object(self):
-        """retrieve and return authenticated user"""
-        return self.request.user
+        """retrieve and return authenticated user, loaded in full as the
+        authentication only loads its id"""
+        return get_user_model().objects.get(pk=self.request.user.pk)